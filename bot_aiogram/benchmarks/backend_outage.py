@@ -0,0 +1,113 @@
+"""Время ответа на шаги навигации, пока бэкенд не отвечает.
+
+Запуск из каталога bot_aiogram:
+    python -m benchmarks.backend_outage --requests 50
+
+Поднимает поддельный бэкенд, который сначала отвечает сразу, а потом
+«зависает» дольше таймаута. Шаги навигации (список кафе и свободные
+места) идут через BackendApi с выключателем и без него (порог выше
+числа запросов). Печатает медиану и максимум задержки за время сбоя и
+сколько шагов получили ответ из последних удачных данных.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from aiohttp import web
+
+from handlers.api import BackendApi, BackendUnavailable
+from settings import Backend
+
+CAFES = [{'id': 1, 'address': 'ул. А', 'number': '1'}]
+
+
+class FakeBackend:
+    """Бэкенд, который по флагу hang перестаёт отвечать."""
+
+    def __init__(self):
+        self.hang = False
+        self.requests = 0
+        self.released = asyncio.Event()
+
+    async def _wait(self):
+        self.requests += 1
+        if self.hang:
+            await self.released.wait()
+
+    async def cafes(self, request):
+        await self._wait()
+        return web.json_response(CAFES)
+
+    async def quantity(self, request):
+        await self._wait()
+        return web.json_response({'quantity': 10})
+
+    async def serve(self, port):
+        app = web.Application()
+        app.router.add_get('/cafes/', self.cafes)
+        app.router.add_post('/cafes/{cafe}/quantity/', self.quantity)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+        return runner
+
+
+async def navigate(api: BackendApi):
+    """Шаг навигации: список кафе и свободные места в первом."""
+    started = time.monotonic()
+    try:
+        await api.get_cafe()
+        await api.post_quantity(1, {'date': '2030-01-01', 'quantity': 0})
+        answered = True
+    except BackendUnavailable:
+        answered = False
+    return time.monotonic() - started, answered
+
+
+async def scenario(args, threshold):
+    backend = FakeBackend()
+    runner = await backend.serve(args.port)
+    api = BackendApi(Backend(
+        url=f'http://127.0.0.1:{args.port}', timeout=args.timeout,
+        pool_size=20, keepalive_timeout=30, cafe_cache_ttl=300,
+        retries=3, retry_backoff=0.05, timeouts={},
+        breaker_threshold=threshold, breaker_reset=60
+    ))
+    await api.start()
+    await navigate(api)
+    backend.hang = True
+    results = [await navigate(api) for _ in range(args.requests)]
+    backend.released.set()
+    await api.close()
+    await runner.cleanup()
+    latencies = [latency for latency, _ in results]
+    return (
+        statistics.median(latencies), max(latencies),
+        sum(answered for _, answered in results), backend.requests
+    )
+
+
+async def run(args):
+    for name, threshold in (
+        ('no breaker', args.requests * 10), ('breaker', 5)
+    ):
+        median, worst, answered, requests = await scenario(args, threshold)
+        print(
+            f'{name:10} median {median * 1e3:8.2f} ms, '
+            f'max {worst * 1e3:8.2f} ms, '
+            f'answered {answered}/{args.requests}, '
+            f'backend requests {requests}'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--timeout', type=float, default=0.2)
+    parser.add_argument('--port', type=int, default=8082)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
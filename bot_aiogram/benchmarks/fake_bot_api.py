@@ -0,0 +1,53 @@
+"""Поддельный Bot API с лимитами Telegram для нагрузочных проверок."""
+import time
+from collections import deque
+
+from aiohttp import web
+
+GLOBAL_LIMIT = 30
+CHAT_INTERVAL = 1.0
+
+
+class FakeBotApi:
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = 0
+        self._recent = deque()
+        self._last_by_chat = {}
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        return app
+
+    async def handle(self, request):
+        data = await request.post()
+        chat_id = int(data['chat_id'])
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 1:
+            self._recent.popleft()
+        last = self._last_by_chat.get(chat_id)
+        if (len(self._recent) >= GLOBAL_LIMIT
+                or (last is not None and now - last < CHAT_INTERVAL)):
+            self.rejected += 1
+            return web.json_response({
+                'ok': False,
+                'error_code': 429,
+                'description': 'Too Many Requests: retry after 1',
+                'parameters': {'retry_after': 1},
+            })
+        self.accepted += 1
+        self._recent.append(now)
+        self._last_by_chat[chat_id] = now
+        return web.json_response({'ok': True, 'result': {
+            'message_id': self.accepted,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': data.get('text', ''),
+        }})
+
+    async def serve(self, host='127.0.0.1', port=8081):
+        runner = web.AppRunner(self.app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
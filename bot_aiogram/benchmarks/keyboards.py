@@ -0,0 +1,52 @@
+"""Стоимость получения клавиатур: сборка заново против кэша.
+
+Запуск из каталога bot_aiogram:
+    python -m benchmarks.keyboards --runs 20000
+"""
+import argparse
+import timeit
+
+from keyboards import reply_keyboards
+
+CAFES = [
+    {'id': number, 'address': f'ул. Тестовая, {number}'}
+    for number in range(1, 7)
+]
+
+
+def report(name, built, cached, runs):
+    built_time = timeit.timeit(built, number=runs) / runs * 1e6
+    cached_time = timeit.timeit(cached, number=runs) / runs * 1e6
+    print(
+        f'{name:32} built {built_time:8.1f} us, '
+        f'cached {cached_time:6.2f} us'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=20000)
+    runs = parser.parse_args().runs
+    for keyboard in reply_keyboards.STATIC_KEYBOARDS:
+        report(keyboard.__name__, keyboard.__wrapped__, keyboard, runs)
+    report(
+        'cafe_select_kbd',
+        lambda: reply_keyboards._cafe_select_kbd.__wrapped__(
+            tuple(cafe['address'] for cafe in CAFES)
+        ),
+        lambda: reply_keyboards.cafe_select_kbd(CAFES),
+        runs
+    )
+    addresses = [cafe['address'] for cafe in CAFES[1:]]
+    report(
+        'choose_another_cafe_kbd',
+        lambda: reply_keyboards._choose_another_cafe_kbd.__wrapped__(
+            tuple(addresses)
+        ),
+        lambda: reply_keyboards.choose_another_cafe_kbd(addresses),
+        runs
+    )
+
+
+if __name__ == '__main__':
+    main()
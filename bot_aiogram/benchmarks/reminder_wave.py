@@ -0,0 +1,89 @@
+"""Волна напоминаний «за 3 часа до ифтара» через поддельный Bot API.
+
+Запуск из каталога bot_aiogram:
+    python -m benchmarks.reminder_wave --messages 600 --chats 400
+
+Сравнивает прямые вызовы bot.send_message из заданий с очередью
+MessageDispatcher: сколько ответов 429 получено и сколько сообщений
+дошло.
+"""
+import argparse
+import asyncio
+import time
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramRetryAfter
+
+from benchmarks.fake_bot_api import FakeBotApi
+from settings import Delivery
+from utils.dispatcher import MessageDispatcher
+
+TOKEN = '42:benchmark'
+
+
+def make_bot(port):
+    session = AiohttpSession(
+        api=TelegramAPIServer.from_base(f'http://127.0.0.1:{port}')
+    )
+    return Bot(TOKEN, session=session)
+
+
+async def direct(bot, messages, chats):
+    lost = 0
+
+    async def job(number):
+        nonlocal lost
+        try:
+            await bot.send_message(chat_id=number % chats, text='reminder')
+        except TelegramRetryAfter:
+            lost += 1
+
+    await asyncio.gather(*(job(number) for number in range(messages)))
+    return lost
+
+
+async def queued(bot, messages, chats, rate):
+    dispatcher = MessageDispatcher(bot, Delivery(
+        global_rate=rate, chat_rate=1, workers=8, max_attempts=5,
+        report_interval=0
+    ))
+    dispatcher.start()
+    for number in range(messages):
+        dispatcher.submit(number % chats, 'reminder')
+    await dispatcher.queue.join()
+    await dispatcher.close()
+    return dispatcher.stats()
+
+
+async def run(args):
+    for name in ('direct', 'queued'):
+        api = FakeBotApi()
+        runner = await api.serve(port=args.port)
+        bot = make_bot(args.port)
+        started = time.monotonic()
+        if name == 'direct':
+            result = {'lost': await direct(bot, args.messages, args.chats)}
+        else:
+            result = await queued(bot, args.messages, args.chats, args.rate)
+        elapsed = time.monotonic() - started
+        await bot.session.close()
+        await runner.cleanup()
+        print(
+            f'{name}: {elapsed:.1f} s, delivered {api.accepted}, '
+            f'429 responses {api.rejected}, {result}'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=600)
+    parser.add_argument('--chats', type=int, default=400)
+    parser.add_argument('--rate', type=float, default=25)
+    parser.add_argument('--port', type=int, default=8081)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Стоимость маршрутизации сообщения на каждом шаге диалога.
+
+Запуск из каталога bot_aiogram:
+    python -m benchmarks.routing --runs 200
+
+Для каждого шага выставляет нужное состояние FSM, прогоняет сообщение
+через Dispatcher с обработчиками из main.register_handlers и печатает
+среднее число вызовов фильтров, запросов к бэкенду и время на апдейт:
+со словарём ExactMatchRouter и с обычной линейной цепочкой фильтров.
+Бэкенд и Bot API заменены заглушками, которые только считают вызовы.
+Если какой-то шаг упал с исключением (например, обработчик вызвал метод
+BackendApi, которого нет в заглушке), печатается число ошибок и
+скрипт завершается с ошибкой.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.dispatcher.event.handler import FilterObject
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.types import Update
+from emoji import emojize
+
+from main import register_handlers
+from middlewares.api_middleware import ApiMiddleware
+from middlewares.fsm_data_middleware import FsmDataMiddleware
+from utils.cafe_directory import CafeDirectory
+from utils.states import StepsForm
+
+CHAT_ID = 1
+ADDRESS = 'ул. Тестовая, 1'
+DAY = (date.today() + timedelta(days=7)).strftime('%d.%m.%Y')
+FSM_DATA = {
+    'address': ADDRESS, 'date': DAY, 'person_amount': '4',
+    'name': 'Иван', 'phone': '89990000000',
+    'data_sets': {'1': 2}, 'total_price': '800',
+}
+# Шаг диалога: название, состояние перед сообщением, текст сообщения.
+STEPS = [
+    ('выбор кафе', StepsForm.CHOOSE_CAFE, ADDRESS),
+    ('меню кафе', StepsForm.CAFE_INFO, 'Забронировать стол'),
+    ('дата', StepsForm.CHOOSE_DATE, DAY),
+    ('число гостей', StepsForm.PERSON_AMOUNT, '4'),
+    ('много гостей', StepsForm.PERSON_AMOUNT, '40'),
+    ('другое кафе', StepsForm.NO_FREE_TABLE, 'Выбрать другое кафе'),
+    ('имя', StepsForm.NAME_STATE, 'Иван'),
+    ('заказ', StepsForm.ORDER_STATE, '1-2'),
+    ('проверка заказа', StepsForm.ORDER_STATE, 'Оплатить'),
+    ('к оплате', StepsForm.ORDER_CHECK_PAY, 'Перейти к оплате'),
+    ('назад', StepsForm.PHONE_STATE, 'Назад ' + emojize(':left_arrow:')),
+    ('отмена', StepsForm.PERSON_AMOUNT, 'Отмена'),
+    ('ошибка ввода', StepsForm.ORDER_CHECK_PAY, 'что-то'),
+]
+
+
+class CountingApi:
+    """Бэкенд с тремя кафе, где всегда 10 свободных мест."""
+
+    def __init__(self, calls: Counter):
+        self.calls = calls
+
+    async def get_cafe(self):
+        self.calls['backend'] += 1
+        return [
+            {'id': number, 'address': f'ул. Тестовая, {number}'}
+            for number in range(1, 4)
+        ]
+
+    async def post_quantity(self, cafe, data):
+        self.calls['backend'] += 1
+        return {'quantity': 10}
+
+    async def post_quantities(self, data):
+        self.calls['backend'] += 1
+        return {
+            'cafes': [{'id': cafe, 'quantity': 10} for cafe in data['cafes']]
+        }
+
+    async def post_hold(self, cafe_id, data, idempotency_key=None):
+        self.calls['backend'] += 1
+        return {'id': 1, 'status': 'held'}
+
+    async def release_hold(self, cafe_id, reservation_id):
+        self.calls['backend'] += 1
+        return {'id': reservation_id, 'status': 'released'}
+
+
+class NullSession(BaseSession):
+    """Сессия Bot API, которая ничего не отправляет."""
+
+    async def make_request(self, bot, method, timeout=None):
+        return None
+
+    async def stream_content(self, url, headers=None, timeout=30,
+                             chunk_size=65536, raise_for_status=True):
+        yield b''
+
+    async def close(self):
+        pass
+
+
+def make_update(number, text):
+    return Update.model_validate({
+        'update_id': number,
+        'message': {
+            'message_id': number,
+            'date': int(time.time()),
+            'chat': {'id': CHAT_ID, 'type': 'private'},
+            'from': {'id': CHAT_ID, 'is_bot': False, 'first_name': 'Иван'},
+            'text': text,
+        },
+    })
+
+
+async def measure(exact_match, runs, calls):
+    bot = Bot('42:benchmark', session=NullSession())
+    api = CountingApi(calls)
+    directory = CafeDirectory(api, ttl=3600)
+    dp = Dispatcher()
+    dp.update.middleware.register(ApiMiddleware(api, directory))
+    dp.update.middleware.register(FsmDataMiddleware())
+    register_handlers(dp, exact_match=exact_match)
+    key = StorageKey(bot_id=bot.id, chat_id=CHAT_ID, user_id=CHAT_ID)
+    await directory.get_all()
+
+    results = []
+    for name, state, text in STEPS:
+        calls.clear()
+        started = time.perf_counter()
+        for number in range(runs):
+            await dp.storage.set_state(key, state)
+            await dp.storage.set_data(key, dict(FSM_DATA))
+            try:
+                await dp.feed_update(bot, make_update(number, text))
+            except Exception:
+                calls['errors'] += 1
+        elapsed = (time.perf_counter() - started) / runs * 1e6
+        results.append((name, dict(calls), elapsed))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=200)
+    runs = parser.parse_args().runs
+    calls = Counter()
+    original_call = FilterObject.call
+
+    async def counting_call(self, *args, **kwargs):
+        calls['filters'] += 1
+        return await original_call(self, *args, **kwargs)
+
+    FilterObject.call = counting_call
+    linear = asyncio.run(measure(False, runs, calls))
+    exact = asyncio.run(measure(True, runs, calls))
+    print(
+        f'{"шаг":18} {"фильтры":>15} {"бэкенд":>11} {"мкс/апдейт":>17} '
+        f'{"ошибки":>11}'
+    )
+    errors = 0
+    for (name, before, before_time), (_, after, after_time) in zip(
+        linear, exact
+    ):
+        print(
+            f'{name:18} '
+            f'{before.get("filters", 0) / runs:6.1f} -> '
+            f'{after.get("filters", 0) / runs:5.1f} '
+            f'{before.get("backend", 0) / runs:4.1f} -> '
+            f'{after.get("backend", 0) / runs:3.1f} '
+            f'{before_time:7.0f} -> {after_time:6.0f} '
+            f'{before.get("errors", 0):4} -> {after.get("errors", 0):3}'
+        )
+        errors += before.get('errors', 0) + after.get('errors', 0)
+    if errors:
+        raise SystemExit(f'{errors} апдейтов завершились исключением')
+
+
+if __name__ == '__main__':
+    main()
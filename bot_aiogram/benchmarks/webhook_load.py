@@ -0,0 +1,109 @@
+"""Нагрузочная проверка вебхука синтетическими обновлениями.
+
+Запуск из каталога bot_aiogram:
+    python -m benchmarks.webhook_load --updates 2000 --clients 50
+
+Поднимает WebhookRunner с обработчиком, который имитирует ожидание
+ввода-вывода, отправляет обновления с секретным заголовком и печатает
+p50/p99 времени от запроса до конца обработки.
+"""
+import argparse
+import asyncio
+import time
+
+import aiohttp
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+from aiohttp import web
+
+from settings import Webhook
+from utils.webhook import SECRET_HEADER, WebhookRunner
+
+SECRET = 'benchmark-secret'
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def make_update(number):
+    return {
+        'update_id': number,
+        'message': {
+            'message_id': number,
+            'date': int(time.time()),
+            'chat': {'id': number % 1000, 'type': 'private'},
+            'from': {
+                'id': number % 1000, 'is_bot': False, 'first_name': 'Load'
+            },
+            'text': 'Забронировать стол',
+        },
+    }
+
+
+async def run(args):
+    sent_at = {}
+    latencies = []
+    done = asyncio.Event()
+    dp = Dispatcher()
+
+    @dp.message()
+    async def handler(message: Message):
+        await asyncio.sleep(args.work)
+        latencies.append(time.monotonic() - sent_at[message.message_id])
+        if len(latencies) == args.updates:
+            done.set()
+
+    config = Webhook(
+        mode='webhook', url='http://127.0.0.1', path='/webhook',
+        secret=SECRET, host='127.0.0.1', port=args.port,
+        max_concurrency=args.concurrency, drain_timeout=5
+    )
+    bot = Bot('42:benchmark')
+    runner = web.AppRunner(WebhookRunner(dp, bot, config).app())
+    await runner.setup()
+    await web.TCPSite(runner, config.host, config.port).start()
+
+    queue = asyncio.Queue()
+    for number in range(1, args.updates + 1):
+        queue.put_nowait(number)
+    url = f'http://{config.host}:{config.port}{config.path}'
+
+    async def client(session):
+        while not queue.empty():
+            number = queue.get_nowait()
+            sent_at[number] = time.monotonic()
+            async with session.post(
+                url, json=make_update(number),
+                headers={SECRET_HEADER: SECRET}
+            ) as response:
+                assert response.status == 200, response.status
+
+    started = time.monotonic()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(client(session) for _ in range(args.clients)))
+    await asyncio.wait_for(done.wait(), 60)
+    elapsed = time.monotonic() - started
+    await runner.cleanup()
+    await bot.session.close()
+    print(
+        f'{args.updates} updates in {elapsed:.1f} s '
+        f'({args.updates / elapsed:.0f}/s), '
+        f'p50 {percentile(latencies, 0.5) * 1000:.1f} ms, '
+        f'p99 {percentile(latencies, 0.99) * 1000:.1f} ms'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--updates', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=40)
+    parser.add_argument('--work', type=float, default=0.05)
+    parser.add_argument('--port', type=int, default=8082)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,34 @@
 from aiogram.filters import BaseFilter
 from aiogram.types import Message
-from handlers.api import get_cafe
+from utils.cafe_directory import CafeDirectory
+from utils.router import cached_filter
 
 
 class IsTrueAdress(BaseFilter):
-    async def __call__(self, message: Message) -> bool:
+    async def __call__(
+            self, message: Message, directory: CafeDirectory,
+            filter_cache: dict = None
+    ) -> bool:
         """Проверка корректности указанного адреса."""
-        cafes = await get_cafe()
-        for cafe in cafes:
-            if message.text == cafe['address']:
-                return {'adress': message.text}
+        if await cached_filter(
+            filter_cache, ('cafe', message.text),
+            lambda: directory.by_address(message.text)
+        ):
+            return {'adress': message.text}
         else:
             return False
 
 
 class IsAnotherCafe(BaseFilter):
-    async def __call__(self, message: Message) -> bool:
+    async def __call__(
+            self, message: Message, directory: CafeDirectory,
+            filter_cache: dict = None
+    ) -> bool:
         """Проверка корректности указанного адреса."""
-        cafes = await get_cafe()
-        for cafe in cafes:
-            if message.text == cafe['address']:
-                return {'adress': message.text}
+        if await cached_filter(
+            filter_cache, ('cafe', message.text),
+            lambda: directory.by_address(message.text)
+        ):
+            return {'adress': message.text}
         else:
             return False
@@ -2,9 +2,11 @@ import re
 
 from aiogram import Bot
 from aiogram.filters import BaseFilter
-from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
-from handlers.api import get_cafe, post_quantity
+from handlers.api import BackendApi
+from utils.cafe_directory import CafeDirectory
+from utils.fsm_data import FsmData
+from utils.router import cached_filter
 
 
 class IsPersonAmount(BaseFilter):
@@ -19,23 +21,25 @@ class IsPersonAmount(BaseFilter):
 
 class TooManyPersons(BaseFilter):
     async def __call__(
-            self, message: Message, bot: Bot, state: FSMContext
+            self, message: Message, bot: Bot,
+            api: BackendApi, directory: CafeDirectory, fsm_data: FsmData,
+            filter_cache: dict = None
     ) -> bool:
         """Проверка числа клиентов для брони столов, если клиентов много."""
-        cafes = await get_cafe(bot)
-        context_data = await state.get_data()
-        address_cafe = context_data.get('address')
-        for cafe in cafes:
-            if cafe['address'] == address_cafe:
-                break
+        if not message.text or not message.text.isdigit():
+            return False
+        cafe = await directory.by_address(fsm_data.get('address'))
         data_dict = {}
         data_dict['date'] = '-'.join(
-            context_data.get('date').split('.')[::-1]
+            fsm_data.get('date').split('.')[::-1]
         )
         data_dict['quantity'] = 0
-        check_current_cafe = await post_quantity(cafe['id'], data=data_dict)
+        check_current_cafe = await cached_filter(
+            filter_cache, ('free_places', cafe['id'], data_dict['date']),
+            lambda: api.post_quantity(cafe['id'], data=data_dict)
+        )
         free_places = check_current_cafe['quantity']
-        if message.text.isdigit() and int(message.text) > int(free_places):
+        if int(message.text) > int(free_places):
             return {'amount': message.text}
         else:
             return False
@@ -1,33 +1,193 @@
+import asyncio
+import json
+import random
+from collections import OrderedDict
+
 import aiohttp
 
+from settings import Backend
+from utils.breaker import CLOSED, CircuitBreaker
+
+# Ошибки, после которых безопасный запрос можно повторить.
+RETRY_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+RETRY_STATUSES = (502, 503, 504)
+# Сколько последних удачных ответов на чтение хранится на случай сбоя.
+FALLBACK_SIZE = 1024
+
+
+class BackendUnavailable(Exception):
+    """Бэкенд не ответил, а сохранённого ответа нет."""
+
+
+class NotFound(Exception):
+    """Бэкенд ответил 404: объекта из пути запроса нет."""
+
+
+class BackendApi:
+    """Клиент API бэкенда с общим пулом соединений.
+
+    Все запросы идут через общий CircuitBreaker. Пока он разомкнут,
+    запросы на чтение получают последний удачный ответ, остальные сразу
+    завершаются BackendUnavailable вместо ожидания таймаута.
+    """
+
+    def __init__(self, config: Backend):
+        self.config = config
+        self.session = None
+        self.breaker = CircuitBreaker(
+            config.breaker_threshold, config.breaker_reset
+        )
+        self._last_good = OrderedDict()
+
+    async def start(self):
+        """Открывает сессию с ограниченным пулом keep-alive соединений."""
+        connector = aiohttp.TCPConnector(
+            limit=self.config.pool_size,
+            keepalive_timeout=self.config.keepalive_timeout
+        )
+        self.session = aiohttp.ClientSession(
+            base_url=self.config.url,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.config.timeout)
+        )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _request(
+            self, method, path, endpoint, idempotency_key=None,
+            fallback=False, raise_not_found=False, **kwargs
+    ):
+        """Запрос к бэкенду.
+
+        Таймаут берётся по имени endpoint из BACKEND_TIMEOUTS. Для
+        запросов с fallback при сбое отдаётся последний удачный ответ.
+        С raise_not_found ответ 404 завершается NotFound.
+        """
+        cache_key = None
+        if fallback:
+            cache_key = (path, json.dumps(kwargs.get('json'), sort_keys=True))
+        if not self.breaker.allow():
+            return self._fallback(cache_key, None)
+        if idempotency_key is not None:
+            kwargs['headers'] = {'Idempotency-Key': idempotency_key}
+        kwargs['timeout'] = aiohttp.ClientTimeout(
+            total=self.config.timeouts.get(endpoint, self.config.timeout)
+        )
+        attempts = 1
+        if method == 'GET' or idempotency_key is not None:
+            attempts += self.config.retries
+        status, answer = await self._send(method, path, attempts, **kwargs)
+        if status is None:
+            self.breaker.failure()
+            return self._fallback(cache_key, answer)
+        self.breaker.success()
+        if raise_not_found and status == 404:
+            raise NotFound(f'{method} {path}')
+        if cache_key is not None and status == 200:
+            self._remember(cache_key, answer)
+        return answer
+
+    async def _send(self, method, path, attempts, **kwargs):
+        """До attempts попыток запроса.
+
+        Повтор — при сетевых ошибках и ответах 502–504, с экспоненциальной
+        паузой со случайным разбросом; повторяются только GET и запросы с
+        ключом идемпотентности, которые бэкенд выполнит один раз. Если
+        выключатель разомкнулся, повторы прекращаются. Возвращает статус и
+        ответ или None и последнюю ошибку.
+        """
+        for attempt in range(attempts):
+            try:
+                async with self.session.request(
+                    method, path, **kwargs
+                ) as response:
+                    if response.status < 500:
+                        return response.status, await response.json()
+                    error = f'{method} {path}: HTTP {response.status}'
+                    retry = response.status in RETRY_STATUSES
+            except RETRY_ERRORS as exc:
+                error = exc
+                retry = True
+            last = attempt == attempts - 1
+            if last or not retry or self.breaker.state != CLOSED:
+                break
+            await asyncio.sleep(
+                random.uniform(0, self.config.retry_backoff * 2 ** attempt)
+            )
+        return None, error
+
+    def _remember(self, cache_key, answer):
+        self._last_good[cache_key] = answer
+        self._last_good.move_to_end(cache_key)
+        if len(self._last_good) > FALLBACK_SIZE:
+            self._last_good.popitem(last=False)
+
+    def _fallback(self, cache_key, error):
+        """Последний удачный ответ или BackendUnavailable."""
+        if cache_key in self._last_good:
+            return self._last_good[cache_key]
+        if isinstance(error, Exception):
+            raise BackendUnavailable(repr(error)) from error
+        raise BackendUnavailable(error or 'circuit breaker is open')
+
+    async def get_cafe(self):
+        return await self._request(
+            'GET', '/cafes/', 'get_cafe', fallback=True
+        )
+
+    async def get_cafe_admins(self, cafe):
+        return await self._request(
+            'GET', f'/cafes/{cafe}/admins/', 'get_cafe_admins', fallback=True
+        )
+
+    async def post_quantity(self, cafe, data):
+        return await self._request(
+            'POST', f'/cafes/{cafe}/quantity/', 'post_quantity', json=data,
+            fallback=True
+        )
 
-async def get_cafe(bot=None):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(
-            'http://backend:8000/cafes/'
-        ) as response:
-            return await response.json()
+    async def post_quantities(self, data):
+        return await self._request(
+            'POST', '/cafes/quantities/', 'post_quantities', json=data,
+            fallback=True
+        )
 
+    async def post_reservation(self, cafe_id, data, idempotency_key=None):
+        return await self._request(
+            'POST', f'/cafes/{cafe_id}/reservations/', 'post_reservation',
+            json=data, idempotency_key=idempotency_key
+        )
 
-async def get_cafe_admins(cafe):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(
-            f'http://backend:8000/cafes/{cafe}/admins/'
-        ) as response:
-            return await response.json()
+    async def post_hold(self, cafe_id, data, idempotency_key=None):
+        return await self._request(
+            'POST', f'/cafes/{cafe_id}/reservations/hold/', 'post_hold',
+            json=data, idempotency_key=idempotency_key, raise_not_found=True
+        )
 
+    async def confirm_reservation(
+            self, cafe_id, reservation_id, idempotency_key=None
+    ):
+        return await self._request(
+            'POST', f'/cafes/{cafe_id}/reservations/{reservation_id}/confirm/',
+            'confirm_reservation', idempotency_key=idempotency_key
+        )
 
-async def post_quantity(cafe, data):
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            f'http://backend:8000/cafes/{cafe}/quantity/', json=data
-        ) as response:
-            return await response.json()
+    async def release_hold(self, cafe_id, reservation_id):
+        return await self._request(
+            'POST', f'/cafes/{cafe_id}/reservations/{reservation_id}/release/',
+            'release_hold'
+        )
 
+    async def claim_outbox(self, limit, lease):
+        return await self._request(
+            'POST', '/outbox/claim/', 'claim_outbox',
+            json={'limit': limit, 'lease': lease}
+        )
 
-async def post_reservation(cafe_id, data):
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            f'http://backend:8000/cafes/{cafe_id}/reservations/', json=data
-        ) as response:
-            return await response.json()
+    async def ack_outbox(self, ids):
+        return await self._request(
+            'POST', '/outbox/ack/', 'ack_outbox', json={'ids': ids}
+        )
@@ -1,3 +1,4 @@
+import logging
 from datetime import datetime, timedelta
 
 from aiogram import Bot
@@ -5,10 +6,12 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from handlers.api import get_cafe
-from handlers.get_sunset import get_sunset_from_api
 from keyboards.reply_keyboards import reminder_kbd
+from utils.cafe_directory import CafeDirectory
+from utils.fsm_data import FsmData
+from utils.scheduler import job_context
 from utils.states import StepsForm
+from utils.sunset import SunsetService
 
 
 async def get_reminder_time(message: Message, bot: Bot, state: FSMContext):
@@ -21,78 +24,132 @@ async def get_reminder_time(message: Message, bot: Bot, state: FSMContext):
     await state.set_state(StepsForm.REMINDER_STATE)
 
 
-async def three_hours_before_iftar(
-        message: Message,
-        bot: Bot,
-        state: FSMContext,
-        apscheduler: AsyncIOScheduler):
-    context_data = await state.get_data()
-    date = context_data.get('date')
-    iftar_time = get_sunset_from_api(date)
-    reminder_time = None
-    if iftar_time < (datetime.now() + timedelta(hours=3)):
-        reminder_time = datetime.now()
-    else:
-        reminder_time = iftar_time - timedelta(hours=2, minutes=59)
+REMINDER_TEXTS = {
+    '3_hours': 'До начала осталось менее 3 часов.\n',
+    '1_day': 'До начала осталось менее 24 часов.\n',
+}
+# За сколько до ифтара напоминание уже опоздало и за сколько его отправлять.
+REMINDER_OFFSETS = {
+    '3_hours': (timedelta(hours=3), timedelta(hours=2, minutes=59)),
+    '1_day': (timedelta(days=1), timedelta(days=1)),
+}
+
+
+def reminder_time(kind: str, iftar_time: datetime):
+    """Когда отправить напоминание: сразу, если до ифтара уже мало.
+
+    Время ифтара с часовым поясом кафе, поэтому планировщик отправит
+    напоминание вовремя при любом SCHEDULER_TIMEZONE.
+    """
+    too_late, before = REMINDER_OFFSETS[kind]
+    now = datetime.now(iftar_time.tzinfo)
+    if iftar_time < (now + too_late):
+        return now
+    return iftar_time - before
+
+
+def reminder_snapshot(fsm_data: FsmData, cafe: dict):
+    """Данные брони для текста напоминания на момент его выбора."""
+    return {
+        'name': fsm_data.get('name'),
+        'address': fsm_data.get('address'),
+        'date': fsm_data.get('date'),
+        'guests': fsm_data.get('person_amount'),
+        'phone': cafe['number'],
+    }
+
+
+def render_reminder(kind: str, reminder: dict):
+    return (
+        f'Здравствуйте, {reminder["name"]}!\n'
+        f'Напоминаем Вам, что {reminder["date"]} вы забронировали стол '
+        f'на {reminder["guests"]} человека в кафе.\n'
+        f'{REMINDER_TEXTS[kind]}'
+        f'Мы ждем Вас по адресу: {reminder["address"]}.\n'
+        'Для отмены брони пожалуйста свяжитесь с нами '
+        f'по телефону {reminder["phone"]}'
+    )
+
+
+def schedule_reminder(
+        apscheduler: AsyncIOScheduler,
+        run_date: datetime,
+        chat_id: int,
+        reservation_id: int,
+        kind: str,
+        reminder: dict,
+        replace_existing: bool = True):
+    """Сохраняет напоминание в хранилище заданий.
+
+    В задании только простые данные, поэтому оно переживает перезапуск;
+    повторный выбор времени заменяет прежнее напоминание по этой брони.
+    Без id брони напоминание не ставится: id задания не был бы уникальным.
+    """
+    if reservation_id is None:
+        logging.error(
+            'Нет id брони, напоминание для чата %s не поставлено', chat_id
+        )
+        return
     apscheduler.add_job(
-        send_reminder_3_hours,
+        'handlers.appsched:send_reminder',
         trigger='date',
-        run_date=reminder_time,
+        run_date=run_date,
+        id=f'reminder-{reservation_id}',
+        replace_existing=replace_existing,
         kwargs={
-            'bot': bot, 'chat_id': message.from_user.id, 'state': state
+            'chat_id': chat_id,
+            'reservation_id': reservation_id,
+            'kind': kind,
+            'reminder': reminder,
         }
     )
+
+
+async def three_hours_before_iftar(
+        message: Message,
+        bot: Bot,
+        state: FSMContext,
+        apscheduler: AsyncIOScheduler,
+        directory: CafeDirectory,
+        sunset: SunsetService,
+        fsm_data: FsmData):
+    date = fsm_data.get('date')
+    cafe = await directory.by_address(fsm_data.get('address'))
+    iftar_time = await sunset.sunset(
+        date, cafe.get('latitude'), cafe.get('longitude'),
+        cafe.get('timezone')
+    )
+    schedule_reminder(
+        apscheduler, reminder_time('3_hours', iftar_time),
+        message.from_user.id,
+        fsm_data.get('reservation_id'), '3_hours',
+        reminder_snapshot(fsm_data, cafe)
+    )
     await message.answer(
         'За 3 часа до брони в выбранный день мы отправим напоминание.\n'
         'С нетерпением ждем встречи с Вами!\n'
     )
 
 
-async def send_reminder_3_hours(bot: Bot, chat_id: int, state: FSMContext):
-    """Напоминание за 3 часа до начала."""
-    cafes = await get_cafe(bot)
-    context_data = await state.get_data()
-    name = context_data.get('name')
-    address = context_data.get('address')
-    date = context_data.get('date')
-    person_amount = context_data.get('person_amount')
-    cafe_number = ''
-    for cafe in cafes:
-        if cafe['address'] == address:
-            break
-    cafe_number = cafe['number']
-    text = (
-        f'Здравствуйте, {name}!\n'
-        f'Напоминаем Вам, что {date} вы забронировали стол '
-        f'на {person_amount} человека в кафе.\n'
-        'До начала осталось менее 3 часов.\n'
-        f'Мы ждем Вас по адресу: {address}.\n'
-        'Для отмены брони пожалуйста свяжитесь с нами '
-        f'по телефону {cafe_number}'
-    )
-    await bot.send_message(chat_id=chat_id, text=text)
-
-
 async def one_day_before_iftar(
         message: Message,
         bot: Bot,
         state: FSMContext,
-        apscheduler: AsyncIOScheduler):
-    context_data = await state.get_data()
-    date = context_data.get('date')
-    iftar_time = get_sunset_from_api(date)
-    reminder_time = None
-    if iftar_time < (datetime.now() + timedelta(days=1)):
-        reminder_time = datetime.now()
-    else:
-        reminder_time = iftar_time - timedelta(days=1)
-    apscheduler.add_job(
-        send_reminder_1_day,
-        trigger='date',
-        run_date=reminder_time,
-        kwargs={
-            'bot': bot, 'chat_id': message.from_user.id, 'state': state
-        }
+        apscheduler: AsyncIOScheduler,
+        directory: CafeDirectory,
+        sunset: SunsetService,
+        fsm_data: FsmData):
+    date = fsm_data.get('date')
+    cafe = await directory.by_address(fsm_data.get('address'))
+    iftar_time = await sunset.sunset(
+        date, cafe.get('latitude'), cafe.get('longitude'),
+        cafe.get('timezone')
+    )
+    schedule_reminder(
+        apscheduler, reminder_time('1_day', iftar_time),
+        message.from_user.id,
+        fsm_data.get('reservation_id'), '1_day',
+        reminder_snapshot(fsm_data, cafe)
     )
     await message.answer(
         'За 24 часа мы отправим напоминание.\n'
@@ -100,40 +157,64 @@ async def one_day_before_iftar(
     )
 
 
-async def send_reminder_1_day(bot: Bot, chat_id: int, state: FSMContext):
-    """Напоминание о за 1 сутки до начала."""
-    cafes = await get_cafe(bot)
-    context_data = await state.get_data()
-    name = context_data.get('name')
-    address = context_data.get('address')
-    date = context_data.get('date')
-    person_amount = context_data.get('person_amount')
-    cafe_number = ''
-    for cafe in cafes:
-        if cafe['address'] == address:
-            break
-    cafe_number = cafe['number']
-    text = (
-        f'Здравствуйте, {name}!\n'
-        f'Напоминаем Вам, что {date} вы забронировали стол '
-        f'на {person_amount} человека в кафе\n'
-        'До начала осталось менее 24 часов.\n'
-        f'Мы ждем Вас по адресу: {address}.'
-        'Для отмены брони пожалуйста свяжитесь с нами '
-        f'по телефону {cafe_number}'
+async def send_reminder(
+        chat_id: int,
+        reservation_id: int,
+        kind: str,
+        reminder: dict):
+    """Ставит напоминание в очередь рассылки по сохранённым данным.
+
+    Задание завершается сразу, поэтому пачка одновременных напоминаний
+    уходит в Telegram с той скоростью, которую допускают лимиты.
+    """
+    job_context()['dispatcher'].submit(
+        chat_id, render_reminder(kind, reminder)
     )
-    await bot.send_message(chat_id=chat_id, text=text)
 
 
-async def no_reminder(message: Message, bot: Bot, state: FSMContext):
+def skip_reminder(
+        apscheduler: AsyncIOScheduler,
+        run_date: datetime,
+        reservation_id: int):
+    """Сохраняет отказ от напоминания в хранилище заданий.
+
+    Пустое задание занимает id напоминания этой брони: прежнее
+    напоминание заменяется, а OutboxRelay, если ещё не обработал событие
+    брони, не поставит напоминание по умолчанию. Задание удаляется само,
+    когда срабатывает после дня брони.
+    """
+    if reservation_id is None:
+        logging.error('Нет id брони, отказ от напоминания не сохранён')
+        return
+    apscheduler.add_job(
+        'handlers.appsched:reminder_skipped',
+        trigger='date',
+        run_date=run_date,
+        id=f'reminder-{reservation_id}',
+        replace_existing=True
+    )
+
+
+async def reminder_skipped():
+    """Клиент отказался от напоминания: отправлять нечего."""
+
+
+async def no_reminder(
+        message: Message,
+        bot: Bot,
+        state: FSMContext,
+        apscheduler: AsyncIOScheduler,
+        directory: CafeDirectory,
+        fsm_data: FsmData):
     """Обработчик отсутствия необходимости напоминания."""
-    cafes = await get_cafe(bot)
-    context_data = await state.get_data()
-    address = context_data.get('address')
-    cafe_number = ''
-    for cafe in cafes:
-        if cafe['address'] == address:
-            break
+    skip_reminder(
+        apscheduler,
+        datetime.strptime(fsm_data.get('date'), '%d.%m.%Y')
+        + timedelta(days=1),
+        fsm_data.get('reservation_id')
+    )
+    address = fsm_data.get('address')
+    cafe = await directory.by_address(address)
     cafe_number = cafe['number']
     await message.answer(
         'Вы отказались от напоминания.\n'
@@ -1,7 +1,7 @@
 from aiogram import Bot
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
-from handlers.api import get_cafe, post_quantity
+from handlers.api import BackendApi, BackendUnavailable, NotFound
 from handlers.get_free_places import get_free_places
 from handlers.media_group import get_media_group, watch_media_group
 from handlers.sets_for_order import make_sets
@@ -15,15 +15,28 @@ from keyboards.reply_keyboards import (back_kbd, cafe_select_kbd,
                                        move_tables_or_change_cafe_kbd,
                                        people_per_table_kbd,
                                        reserve_or_back_kbd, table_or_back_kbd)
+from utils.cafe_directory import CafeDirectory
+from utils.fsm_data import FsmData
 from utils.states import StepsForm
 
+# Ответ вместо брони, если выбранного кафе больше нет.
+CAFE_GONE = {
+    'status': 'error',
+    'message': 'Это кафе больше не принимает брони, выберите другое кафе'
+}
 
-async def get_start(message: Message, bot: Bot, state: FSMContext):
+
+async def get_start(
+    message: Message, bot: Bot, state: FSMContext, directory: CafeDirectory
+):
     """Приветствие и выбор адреса кафе."""
-    cafes = await get_cafe(bot)
+    try:
+        cafes = await directory.get_all()
+    except BackendUnavailable:
+        cafes = None
     if cafes is None:
         await state.set_state(StepsForm.ERROR)
-        await bot_error(message, bot, FSMContext)
+        await bot_error(message, bot, state)
     else:
         await message.answer('Здравствуйте!\n'
                              'Я чат-бот сети кафе!\n'
@@ -33,25 +46,31 @@ async def get_start(message: Message, bot: Bot, state: FSMContext):
         await state.set_state(StepsForm.CHOOSE_CAFE)
 
 
-async def main_cafe_menu(message: Message, bot: Bot, state: FSMContext):
+async def main_cafe_menu(
+    message: Message, bot: Bot, state: FSMContext, fsm_data: FsmData
+):
     """Главное меню выбранного кафе."""
     await message.answer('Чем я могу помочь?', reply_markup=main_cafe_kbd())
     if message.text.startswith('Назад'):
         pass
     else:
-        await state.update_data(address=message.text)
+        fsm_data.update(address=message.text)
     await state.set_state(StepsForm.CAFE_INFO)
 
 
-async def back_to_start(message: Message, bot: Bot, state: FSMContext):
+async def back_to_start(
+    message: Message, bot: Bot, state: FSMContext, directory: CafeDirectory
+):
     """Переход в начало диалога по кнопке 'Отмена'."""
-    await get_start(message, bot, state)
+    await get_start(message, bot, state, directory)
     await state.set_state(StepsForm.CHOOSE_CAFE)
 
 
-async def back_to_cafe_menu(message: Message, bot: Bot, state: FSMContext):
+async def back_to_cafe_menu(
+    message: Message, bot: Bot, state: FSMContext, fsm_data: FsmData
+):
     """Переход в главное меню кафе по кнопке 'Назад'."""
-    await main_cafe_menu(message, bot, state)
+    await main_cafe_menu(message, bot, state, fsm_data)
     await state.set_state(StepsForm.CAFE_INFO)
 
 
@@ -61,45 +80,53 @@ async def back_to_date(message: Message, bot: Bot, state: FSMContext):
     await state.set_state(StepsForm.CHOOSE_DATE)
 
 
-async def back_to_persons(message: Message, bot: Bot, state: FSMContext):
+async def back_to_persons(
+    message: Message, bot: Bot, state: FSMContext,
+    api: BackendApi, directory: CafeDirectory, fsm_data: FsmData
+):
     """Переход к выбору количества персон по кнопке 'Назад'."""
-    await person_per_table(message, bot, state)
+    await person_per_table(message, bot, state, api, directory, fsm_data)
     await state.set_state(StepsForm.PERSON_AMOUNT)
 
 
-async def back_to_name(message: Message, bot: Bot, state: FSMContext):
+async def back_to_name(
+    message: Message, bot: Bot, state: FSMContext, fsm_data: FsmData
+):
     """Переход к вводу имени по кнопке 'Назад'."""
-    await name_for_reserving(message, bot, state)
+    await name_for_reserving(message, bot, state, fsm_data)
     await state.set_state(StepsForm.NAME_STATE)
 
 
-async def back_to_no_table(message: Message, bot: Bot, state: FSMContext):
+async def back_to_no_table(
+    message: Message, bot: Bot, state: FSMContext, fsm_data: FsmData
+):
     """Переход от выбора альтернативного кафе по кнопке 'Назад'."""
-    await no_free_table(message, bot, state)
+    await no_free_table(message, bot, state, fsm_data)
     await state.set_state(StepsForm.NO_FREE_TABLE)
 
 
-async def back_to_phone(message: Message, bot: Bot, state: FSMContext):
+async def back_to_phone(
+    message: Message, bot: Bot, state: FSMContext, fsm_data: FsmData
+):
     """Переход к вводу номера телефона по кнопке 'Назад'."""
-    await get_phone(message, bot, state)
+    await get_phone(message, bot, state, fsm_data)
     await state.set_state(StepsForm.PHONE_STATE)
 
 
-async def back_to_set(message: Message, bot: Bot, state: FSMContext):
+async def back_to_set(
+    message: Message, bot: Bot, state: FSMContext, fsm_data: FsmData
+):
     """Переход из заказа к началу выбора сетов по кнопке 'Назад'."""
-    await choose_set(message, bot, state)
+    await choose_set(message, bot, state, fsm_data)
     await state.set_state(StepsForm.ORDER_STATE)
 
 
-async def get_contacts(message: Message, bot: Bot, state: FSMContext):
+async def get_contacts(
+    message: Message, bot: Bot, state: FSMContext,
+    directory: CafeDirectory, fsm_data: FsmData
+):
     """Страничка контактов выбранного кафе."""
-    cafes = await get_cafe(bot)
-    context_data = await state.get_data()
-    address_cafe = context_data.get('address')
-    cafe_number = ''
-    for cafe in cafes:
-        if cafe['address'] == address_cafe:
-            break
+    cafe = await directory.by_address(fsm_data.get('address'))
     cafe_number = cafe['number']
     await message.answer(f'Номер выбранного кафе: {cafe_number}\n'
                          'Режим работы: ежедневно с 9:00 до 20:00',
@@ -134,22 +161,22 @@ async def choose_date(message: Message, bot: Bot, state: FSMContext):
     await state.set_state(StepsForm.CHOOSE_DATE)
 
 
-async def person_per_table(message: Message, bot: Bot, state: FSMContext):
+async def person_per_table(
+    message: Message, bot: Bot, state: FSMContext,
+    api: BackendApi, directory: CafeDirectory, fsm_data: FsmData
+):
     """Выбор количества персон для брони стола."""
     if message.text.startswith('Назад'):
         pass
     else:
-        await state.update_data(date=message.text)
-    cafes = await get_cafe(bot)
-    context_data = await state.get_data()
-    address_cafe = context_data.get('address')
-    for cafe in cafes:
-        if cafe['address'] == address_cafe:
-            break
+        fsm_data.update(date=message.text)
+    cafe = await directory.by_address(fsm_data.get('address'))
     data_dict = {}
-    data_dict['date'] = '-'.join(context_data.get('date').split('.')[::-1])
+    data_dict['date'] = '-'.join(fsm_data.get('date').split('.')[::-1])
     data_dict['quantity'] = 0
-    check_current_cafe = await post_quantity(cafe['id'], data=data_dict)
+    check_current_cafe = await api.post_quantity(
+        cafe['id'], data=data_dict
+    )
     free_places = check_current_cafe['quantity']
     await message.answer(
         'Количество свободных мест в этом кафе '
@@ -160,43 +187,50 @@ async def person_per_table(message: Message, bot: Bot, state: FSMContext):
     await state.set_state(StepsForm.PERSON_AMOUNT)
 
 
-async def name_for_reserving(message: Message, bot: Bot, state: FSMContext):
+async def name_for_reserving(
+    message: Message, bot: Bot, state: FSMContext, fsm_data: FsmData
+):
     """Получение имени для брони стола."""
     await message.answer('На чье имя бронируем стол?',
                          reply_markup=enter_name_kbd())
     if message.text.startswith('Назад'):
         pass
     elif message.text.startswith('ул.'):
-        await state.update_data(address=message.text)
+        fsm_data.update(address=message.text)
     else:
-        await state.update_data(person_amount=message.text)
+        fsm_data.update(person_amount=message.text)
     await state.set_state(StepsForm.NAME_STATE)
 
 
-async def get_my_name(message: Message, bot: Bot, state: FSMContext):
+async def get_my_name(
+    message: Message, bot: Bot, state: FSMContext, fsm_data: FsmData
+):
     """Получение имени пользователя по кнопке 'На моё имя'."""
     await message.answer(f'{message.from_user.first_name}')
-    await state.set_state(StepsForm.NAME_STATE)
-    await get_phone(message, bot, state)
+    await get_phone(message, bot, state, fsm_data)
 
 
-async def get_phone(message: Message, bot: Bot, state: FSMContext):
+async def get_phone(
+    message: Message, bot: Bot, state: FSMContext, fsm_data: FsmData
+):
     """Получение номера телефона для брони стола."""
     await message.answer('Введите номер телефона для бронирования стола',
                          reply_markup=enter_phone_kbd())
     if message.text.startswith('Назад'):
         pass
     elif message.text == 'На моё имя':
-        await state.update_data(name=message.from_user.first_name)
+        fsm_data.update(name=message.from_user.first_name)
     else:
-        await state.update_data(name=message.text)
+        fsm_data.update(name=message.text)
     await state.set_state(StepsForm.PHONE_STATE)
 
 
-async def choose_set(message: Message, bot: Bot, state: FSMContext):
+async def choose_set(
+    message: Message, bot: Bot, state: FSMContext, fsm_data: FsmData
+):
     """Меню для оформления заказа с количеством порций."""
     if message.text is not None and not message.text.startswith('Назад'):
-        await state.update_data(phone=message.text)
+        fsm_data.update(phone=message.text)
     else:
         pass
     await get_media_group(message, bot)
@@ -204,18 +238,15 @@ async def choose_set(message: Message, bot: Bot, state: FSMContext):
 
 
 async def confirm_order(
-    message: Message, bot: Bot, sets: dict, state: FSMContext
+    message: Message, bot: Bot, sets: dict, state: FSMContext,
+    fsm_data: FsmData
 ):
     """Выводит заказ пользователя в преобразованом виде для проверки."""
     make_sets(sets)
-    await state.update_data(total_price=f'{sets["total_price"]}')
-    del sets['total_price']
-    await state.update_data(data_sets=sets)
-    context_data = await state.get_data()
-    data_sets_order = context_data.get('data_sets')
-    total_price = context_data.get('total_price')
+    total_price = f'{sets.pop("total_price")}'
+    fsm_data.update(total_price=total_price, data_sets=sets)
     text = 'Вы выбрали:\n'
-    for number, amount in data_sets_order.items():
+    for number, amount in sets.items():
         text += f'Сет №{number} в количестве {amount} шт.\n'
     text += (
         f'Общая стоимость: {total_price} руб.\n'
@@ -228,11 +259,12 @@ async def confirm_order(
 
 
 async def get_true_contact(
-        message: Message, bot: Bot, phone: str, state: FSMContext):
+        message: Message, bot: Bot, phone: str, state: FSMContext,
+        fsm_data: FsmData):
     """Если заказчик правильно указал телефон, то в чат вернется номер."""
-    await state.update_data(phone=f'{phone}')
+    fsm_data.update(phone=f'{phone}')
     await message.answer(f'{phone}')
-    await choose_set(message, bot, state)
+    await choose_set(message, bot, state, fsm_data)
 
 
 async def get_fake_contact(message: Message, bot: Bot, state: FSMContext):
@@ -241,16 +273,97 @@ async def get_fake_contact(message: Message, bot: Bot, state: FSMContext):
     await state.set_state(StepsForm.PHONE_STATE)
 
 
-async def check_order_go_to_pay(message: Message, bot: Bot, state: FSMContext):
-    """Клиент проверяет перечень заказанного и переходит к оплате."""
-    context_data = await state.get_data()
-    name = context_data.get('name')
-    phone = context_data.get('phone')
-    date = context_data.get('date')
-    person_amount = context_data.get('person_amount')
-    address = context_data.get('address')
-    data_sets_order = context_data.get('data_sets')
-    total_price = context_data.get('total_price')
+def reservation_data(fsm_data: FsmData, chat_id: int):
+    """Тело запроса брони по данным диалога."""
+    return {
+        'quantity': fsm_data.get('person_amount'),
+        'sets': [
+            {'sets': number, 'quantity': amount}
+            for number, amount in fsm_data.get('data_sets').items()
+        ],
+        'date': '-'.join(fsm_data.get('date').split('.')[::-1]),
+        'name': fsm_data.get('name'),
+        'number': fsm_data.get('phone'),
+        'chat_id': chat_id,
+    }
+
+
+async def hold_tables(
+    api: BackendApi, directory: CafeDirectory, fsm_data: FsmData,
+    chat_id: int, idempotency_key: str
+):
+    """Удержать столы в выбранном кафе на время оплаты.
+
+    Прежнее удержание этого диалога освобождается. Ключ идемпотентности
+    берётся из апдейта, поэтому повторная доставка того же апдейта не
+    удержит столы второй раз. Возвращает ответ бэкенда: при успехе в нём
+    есть id брони.
+
+    Если кафе уже нет в бэкенде (адреса нет в списке или бэкенд ответил
+    404), кэш списка кафе сбрасывается, чтобы клиенту предложили только
+    существующие кафе. Остальные ошибки бэкенда возвращаются как есть.
+    """
+    if fsm_data.get('reservation_id') is not None:
+        await api.release_hold(
+            fsm_data.get('cafe_id'), fsm_data.get('reservation_id')
+        )
+    cafe = await directory.by_address(fsm_data.get('address'))
+    answer = CAFE_GONE
+    if cafe is not None:
+        try:
+            answer = await api.post_hold(
+                cafe['id'], reservation_data(fsm_data, chat_id),
+                idempotency_key
+            )
+        except NotFound:
+            answer = CAFE_GONE
+    if answer is CAFE_GONE:
+        directory.invalidate()
+    if 'id' in answer:
+        fsm_data.update(cafe_id=cafe['id'], reservation_id=answer['id'])
+    else:
+        fsm_data.update(cafe_id=None, reservation_id=None)
+    return answer
+
+
+async def no_tables_left(
+    message: Message, state: FSMContext, directory: CafeDirectory,
+    answer: dict
+):
+    """Удержать столы не удалось: предлагаем выбрать другое кафе."""
+    text = 'В этом кафе закончились столы, выберите другое кафе'
+    if answer is CAFE_GONE:
+        text = answer['message']
+    await message.answer(
+        text,
+        reply_markup=cafe_select_kbd(await directory.get_all())
+    )
+    await state.set_state(StepsForm.PAY_STATE)
+
+
+async def check_order_go_to_pay(
+    message: Message, bot: Bot, state: FSMContext,
+    api: BackendApi, directory: CafeDirectory, fsm_data: FsmData
+):
+    """Клиент проверяет перечень заказанного и переходит к оплате.
+
+    Столы удерживаются уже здесь, чтобы при pre_checkout_query осталось
+    только подтвердить бронь.
+    """
+    answer = await hold_tables(
+        api, directory, fsm_data, message.chat.id,
+        f'hold-{message.chat.id}-{message.message_id}'
+    )
+    if 'id' not in answer:
+        await no_tables_left(message, state, directory, answer)
+        return
+    name = fsm_data.get('name')
+    phone = fsm_data.get('phone')
+    date = fsm_data.get('date')
+    person_amount = fsm_data.get('person_amount')
+    address = fsm_data.get('address')
+    data_sets_order = fsm_data.get('data_sets')
+    total_price = fsm_data.get('total_price')
     text = (
         'Проверьте Ваш заказ:\n'
         f'Имя: {name}\n'
@@ -274,12 +387,14 @@ async def choose_pay_method(message: Message, bot: Bot, state: FSMContext):
     await state.set_state(StepsForm.PAY_STATE)
 
 
-async def no_free_table(message: Message, bot: Bot, state: FSMContext):
+async def no_free_table(
+    message: Message, bot: Bot, state: FSMContext, fsm_data: FsmData
+):
     """Диалог при отсутствии свободных столов."""
     if message.text.startswith('Назад'):
         pass
     else:
-        await state.update_data(person_amount=message.text)
+        fsm_data.update(person_amount=message.text)
     await message.answer('К сожалению нужного столика нет в наличии.\n'
                          'Можем предложить Вам забронировать стол '
                          'в другом кафе нашей сети.',
@@ -287,11 +402,13 @@ async def no_free_table(message: Message, bot: Bot, state: FSMContext):
     await state.set_state(StepsForm.NO_FREE_TABLE)
 
 
-async def choose_another_cafe(message: Message, bot: Bot, state: FSMContext):
+async def choose_another_cafe(
+    message: Message, bot: Bot, state: FSMContext,
+    api: BackendApi, directory: CafeDirectory, fsm_data: FsmData
+):
     """Выбрать кафе со свободными столами запрошенной вместимости."""
-    cafes = await get_cafe(bot)
-    context_data = await state.get_data()
-    cafe_list = await get_free_places(cafes, context_data)
+    cafes = await directory.get_all()
+    cafe_list = await get_free_places(api, cafes, fsm_data)
     await message.answer(
         'На кнопках ниже представлены адреса кафе с подходящим количеством '
         'свободных столов. \n Пожалуйста выберите адрес.',
@@ -313,8 +430,18 @@ async def bot_error(message: Message, bot: Bot, state: FSMContext):
     )
 
 
-async def pay_again_other_cafe(message: Message, bot: Bot, state: FSMContext):
+async def pay_again_other_cafe(
+    message: Message, bot: Bot, state: FSMContext,
+    api: BackendApi, directory: CafeDirectory, fsm_data: FsmData
+):
     """Клиент выбирает другое кафе, если нет мест."""
-    await state.update_data(address=message.text)
+    fsm_data.update(address=message.text)
+    answer = await hold_tables(
+        api, directory, fsm_data, message.chat.id,
+        f'hold-{message.chat.id}-{message.message_id}'
+    )
+    if 'id' not in answer:
+        await no_tables_left(message, state, directory, answer)
+        return
     await message.answer('Выберите способ оплаты',
                          reply_markup=choose_pay_type_kbd())
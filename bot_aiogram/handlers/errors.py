@@ -0,0 +1,22 @@
+import logging
+
+from aiogram import Bot
+from aiogram.types import ErrorEvent
+
+UNAVAILABLE_TEXT = (
+    'Сервис бронирования временно недоступен, попробуйте через пару минут.'
+)
+
+
+async def backend_unavailable(event: ErrorEvent, bot: Bot):
+    """Бэкенд недоступен: отвечаем клиенту, а не молчим до таймаута."""
+    logging.warning('Бэкенд недоступен: %s', event.exception)
+    update = event.update
+    if update.pre_checkout_query is not None:
+        await bot.answer_pre_checkout_query(
+            update.pre_checkout_query.id,
+            ok=False,
+            error_message=UNAVAILABLE_TEXT
+        )
+    elif update.message is not None:
+        await update.message.answer(UNAVAILABLE_TEXT)
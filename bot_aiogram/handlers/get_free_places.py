@@ -1,25 +1,18 @@
-from handlers.api import post_quantity
-
-
-async def get_free_places(cafes, context_data):
-    """Получить количество свободных мест в кафе."""
-    avaliable_cafes = []
+async def get_free_places(api, cafes, context_data):
+    """Получить адреса других кафе с достаточным количеством мест."""
     person_amount = int(context_data.get('person_amount'))
-    for cafe in cafes:
-        if cafe['address'] == context_data.get('address'):
-            del cafe
-        else:
-            data_dict = {}
-            data_dict['date'] = '-'.join(
-                context_data.get('date').split('.')[::-1]
-            )
-            data_dict['quantity'] = 0
-            check_current_cafe = await post_quantity(
-                cafe['id'], data=data_dict
-            )
-            free_places = int(check_current_cafe['quantity'])
-            if person_amount <= free_places:
-                avaliable_cafes.append(cafe['address'])
-            else:
-                del cafe
-    return avaliable_cafes
+    other_cafes = [
+        cafe for cafe in cafes
+        if cafe['address'] != context_data.get('address')
+    ]
+    data_dict = {}
+    data_dict['date'] = '-'.join(context_data.get('date').split('.')[::-1])
+    data_dict['cafes'] = [cafe['id'] for cafe in other_cafes]
+    answer = await api.post_quantities(data=data_dict)
+    free_places = {
+        cafe['id']: int(cafe['quantity']) for cafe in answer['cafes']
+    }
+    return [
+        cafe['address'] for cafe in other_cafes
+        if person_amount <= free_places.get(cafe['id'], 0)
+    ]
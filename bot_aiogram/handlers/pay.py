@@ -2,17 +2,18 @@ from aiogram import Bot
 from aiogram.fsm.context import FSMContext
 from aiogram.types import LabeledPrice, Message, PreCheckoutQuery
 
-from handlers.basic import cafe_select_kbd
-from handlers.api import get_cafe, post_reservation, get_cafe_admins
+from handlers.basic import cafe_select_kbd, hold_tables
+from handlers.api import BackendApi
 from handlers.appsched import get_reminder_time
 from settings import settings
+from utils.cafe_directory import CafeDirectory
+from utils.fsm_data import FsmData
 from utils.states import StepsForm
 
 
-async def order(message: Message, bot: Bot, state: FSMContext):
+async def order(message: Message, bot: Bot, fsm_data: FsmData):
     """Перечень заказа и настройки для оплаты онлайн."""
-    context_data = await state.get_data()
-    total_price = int(context_data.get('total_price')) * 100
+    total_price = int(fsm_data.get('total_price')) * 100
     discount = 0
     if int(total_price) > 50000:
         discount = 50000 - int(total_price)
@@ -65,40 +66,49 @@ async def order(message: Message, bot: Bot, state: FSMContext):
 async def pre_checkout_query(
     pre_checkout_query: PreCheckoutQuery,
     bot: Bot,
-    state: FSMContext
+    api: BackendApi,
+    directory: CafeDirectory,
+    fsm_data: FsmData
 ):
-    """Обработка заказа. Поскольку у нас нет доставки, тут авто согласие."""
-    cafes = await get_cafe(bot)
-    context_data = await state.get_data()
-    address_cafe = context_data.get('address')
-    for cafe in cafes:
-        if cafe['address'] == address_cafe:
-            break
-    data_dict = {}
-    data_dict['quantity'] = context_data.get('person_amount')
-    data_dict['sets'] = []
-    for set, value in context_data.get('data_sets').items():
-        data_dict['sets'].append({'sets': set, 'quantity': value})
-    data_dict['date'] = '-'.join(context_data.get('date').split('.')[::-1])
-    data_dict['name'] = context_data.get('name')
-    data_dict['number'] = context_data.get('phone')
-    answer = await post_reservation(cafe['id'], data_dict)
+    """Подтверждение удержанных столов.
+
+    Telegram ждёт ответа не больше 10 секунд, поэтому здесь только
+    подтверждается удержание из check_order_go_to_pay. Если оно уже
+    истекло, столы удерживаются заново. Ключ идемпотентности — id
+    запроса, поэтому повтор pre_checkout_query от Telegram не создаёт
+    вторую бронь.
+    """
+    key = f'checkout-{pre_checkout_query.id}'
+    answer = {}
+    if fsm_data.get('reservation_id') is not None:
+        answer = await api.confirm_reservation(
+            fsm_data.get('cafe_id'), fsm_data.get('reservation_id'), key
+        )
+    if 'id' not in answer:
+        answer = await hold_tables(
+            api, directory, fsm_data, pre_checkout_query.from_user.id, key
+        )
+        if 'id' in answer:
+            answer = await api.confirm_reservation(
+                fsm_data.get('cafe_id'), answer['id'], key
+            )
     if 'id' in answer.keys():
         await bot.answer_pre_checkout_query(
             pre_checkout_query.id,
             ok=True
         )
-        await state.update_data(cafe_id=cafe['id'])
     else:
         await bot.answer_pre_checkout_query(
             pre_checkout_query.id,
             ok=False,
-            error_message=answer['message']
+            error_message=answer.get(
+                'message', 'Не удалось подтвердить бронь, попробуйте ещё раз'
+            )
         )
         await bot.send_message(
             chat_id=pre_checkout_query.from_user.id,
             text='В этом кафе закончились столы, выберите другое кафе',
-            reply_markup=cafe_select_kbd(cafes)
+            reply_markup=cafe_select_kbd(await directory.get_all())
         )
 
 
@@ -107,7 +117,11 @@ async def succesfull_payment(
         bot: Bot,
         state: FSMContext
 ):
-    """Сообщение об успешной оплате заказа."""
+    """Сообщение об успешной оплате заказа.
+
+    Админов уведомляет OutboxRelay по событию, которое бэкенд записал
+    вместе с бронью.
+    """
     msg = (
         'Ваш заказ общей стоимостью: '
         f'{message.successful_payment.total_amount // 100} '
@@ -115,29 +129,5 @@ async def succesfull_payment(
         f'\r\nСпасибо, что выбираете нас!'
     )
     await message.answer(msg)
-    context_data = await state.get_data()
-    name = context_data.get('name')
-    phone = context_data.get('phone')
-    date = context_data.get('date')
-    person_amount = context_data.get('person_amount')
-    address = context_data.get('address')
-    data_sets_order = context_data.get('data_sets')
-    total_price = context_data.get('total_price')
-    text = (
-        'Поступил заказ:\n'
-        f'Имя: {name}\n'
-        f'Телефон: {phone}\n'
-        f'Дата: {date}\n'
-        f'Адрес: {address}\n'
-        f'Количество гостей: {person_amount}\n'
-    )
-    for number, amount in data_sets_order.items():
-        text += f'Сет №{number} в количестве {amount} шт.\n'
-    text += f'Общая стоимость: {total_price} руб.'
-    cafe_id = context_data.get('cafe_id')
-    admins = await get_cafe_admins(cafe_id)
-    admins = admins['admins']
-    for admin in admins:
-        await bot.send_message(chat_id=admin['telegram'], text=text)
     await state.set_state(StepsForm.FINAL_STATE)
     await get_reminder_time(message, bot, state)
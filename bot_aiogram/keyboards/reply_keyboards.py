@@ -1,7 +1,13 @@
+from functools import lru_cache
+
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 from emoji import emojize
 
+# Сколько разных наборов адресов кафе держать в кэше клавиатур.
+CAFE_KEYBOARDS_CACHE_SIZE = 128
+
 
+@lru_cache(maxsize=None)
 def start_kbd():
     """Клавиатура запуска бота."""
     keyboard_builder = ReplyKeyboardBuilder()
@@ -12,6 +18,7 @@ def start_kbd():
     )
 
 
+@lru_cache(maxsize=None)
 def back_kbd():
     """Клавиатура возвращения назад."""
     keyboard_builder = ReplyKeyboardBuilder()
@@ -24,9 +31,14 @@ def back_kbd():
 
 def cafe_select_kbd(cafes):
     """Клавиатура выбора кафе."""
+    return _cafe_select_kbd(tuple(cafe['address'] for cafe in cafes))
+
+
+@lru_cache(maxsize=CAFE_KEYBOARDS_CACHE_SIZE)
+def _cafe_select_kbd(addresses):
     keyboard_builder = ReplyKeyboardBuilder()
-    for cafe in cafes:
-        keyboard_builder.button(text=cafe['address'])
+    for address in addresses:
+        keyboard_builder.button(text=address)
     keyboard_builder.adjust(2)
     return keyboard_builder.as_markup(
         resize_keyboard=True,
@@ -34,6 +46,7 @@ def cafe_select_kbd(cafes):
     )
 
 
+@lru_cache(maxsize=None)
 def main_cafe_kbd():
     """Основная клавиатура навигации по кафе."""
     keyboard_builder = ReplyKeyboardBuilder()
@@ -49,6 +62,7 @@ def main_cafe_kbd():
     )
 
 
+@lru_cache(maxsize=None)
 def table_or_back_kbd():
     """Перейти к бронированию стола или вернуться назад."""
     keyboard_builder = ReplyKeyboardBuilder()
@@ -61,6 +75,7 @@ def table_or_back_kbd():
     )
 
 
+@lru_cache(maxsize=None)
 def reserve_or_back_kbd():
     """Выбрать дату бронирования стола или вернуться назад."""
     keyboard_builder = ReplyKeyboardBuilder()
@@ -73,6 +88,7 @@ def reserve_or_back_kbd():
     )
 
 
+@lru_cache(maxsize=None)
 def people_per_table_kbd():
     """Выбрать количество персон или вернуться назад."""
     keyboard_builder = ReplyKeyboardBuilder()
@@ -89,6 +105,7 @@ def people_per_table_kbd():
     )
 
 
+@lru_cache(maxsize=None)
 def move_tables_or_change_cafe_kbd():
     """Сдвигать столы или сменить кафе."""
     keyboard_builder = ReplyKeyboardBuilder()
@@ -104,8 +121,13 @@ def move_tables_or_change_cafe_kbd():
 
 def choose_another_cafe_kbd(cafe_list):
     """Выбрать другое кафе, если в текущем нет столов."""
+    return _choose_another_cafe_kbd(tuple(cafe_list))
+
+
+@lru_cache(maxsize=CAFE_KEYBOARDS_CACHE_SIZE)
+def _choose_another_cafe_kbd(addresses):
     keyboard_builder = ReplyKeyboardBuilder()
-    for cafe_address in cafe_list:
+    for cafe_address in addresses:
         keyboard_builder.button(text=cafe_address)
     keyboard_builder.adjust(2)
     keyboard_builder.button(text='Назад ' + emojize(':reverse_button:'))
@@ -117,6 +139,7 @@ def choose_another_cafe_kbd(cafe_list):
     )
 
 
+@lru_cache(maxsize=None)
 def enter_name_kbd():
     """Отправить имя или вернуться назад."""
     keyboard_builder = ReplyKeyboardBuilder()
@@ -130,6 +153,7 @@ def enter_name_kbd():
     )
 
 
+@lru_cache(maxsize=None)
 def enter_phone_kbd():
     """Отправить номер телефона или вернуться назад."""
     keyboard_builder = ReplyKeyboardBuilder()
@@ -145,6 +169,7 @@ def enter_phone_kbd():
     )
 
 
+@lru_cache(maxsize=None)
 def go_to_pay_or_choose_food_kbd():
     """Продолжить выбор еды или перейти к оплате."""
     keyboard_builder = ReplyKeyboardBuilder()
@@ -158,6 +183,7 @@ def go_to_pay_or_choose_food_kbd():
     )
 
 
+@lru_cache(maxsize=None)
 def check_order_kbd():
     """Проверить заказ и перейти к оплате."""
     keyboard_builder = ReplyKeyboardBuilder()
@@ -171,6 +197,7 @@ def check_order_kbd():
     )
 
 
+@lru_cache(maxsize=None)
 def choose_pay_type_kbd():
     """Выбрать способ оплаты."""
     keyboard_builder = ReplyKeyboardBuilder()
@@ -183,6 +210,7 @@ def choose_pay_type_kbd():
     )
 
 
+@lru_cache(maxsize=None)
 def no_free_tables_kbd():
     """Появляется в случае отсутствия свободных столов в кафе."""
     keyboard_builder = ReplyKeyboardBuilder()
@@ -196,6 +224,7 @@ def no_free_tables_kbd():
     )
 
 
+@lru_cache(maxsize=None)
 def reminder_kbd():
     """Клавиатура выбора периода напоминания о заказе."""
     keyboard_builder = ReplyKeyboardBuilder()
@@ -208,3 +237,27 @@ def reminder_kbd():
         one_time_keyboard=True,
         input_field_placeholder='Выберите одну из кнопок.'
     )
+
+
+STATIC_KEYBOARDS = (
+    start_kbd, back_kbd, main_cafe_kbd, table_or_back_kbd,
+    reserve_or_back_kbd, people_per_table_kbd, move_tables_or_change_cafe_kbd,
+    enter_name_kbd, enter_phone_kbd, go_to_pay_or_choose_food_kbd,
+    check_order_kbd, choose_pay_type_kbd, no_free_tables_kbd, reminder_kbd,
+)
+
+
+def build_static_keyboards():
+    """Собрать статические клавиатуры заранее, при запуске бота.
+
+    Клавиатуры кэшируются и переиспользуются всеми обновлениями,
+    поэтому изменять возвращённую разметку нельзя.
+    """
+    for keyboard in STATIC_KEYBOARDS:
+        keyboard()
+
+
+def clear_cafe_keyboards():
+    """Сбросить клавиатуры с адресами кафе после изменения списка кафе."""
+    _cafe_select_kbd.cache_clear()
+    _choose_another_cafe_kbd.cache_clear()
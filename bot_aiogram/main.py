@@ -2,17 +2,16 @@ import asyncio
 import logging
 
 from aiogram import Bot, Dispatcher, F
-from aiogram.filters import Command, or_f
-from aiogram.fsm.storage.memory import MemoryStorage
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from aiogram.filters import Command, ExceptionTypeFilter, or_f
 from emoji import emojize
 
-from filters.back_to_start import GoToStart
+from filters.back_to_start import MOVE_BACK_COMMANDS
 from filters.is_adress import IsAnotherCafe, IsTrueAdress
 from filters.is_contact import IsTrueContact
 from filters.is_correct_date import IsCorrectDate
 from filters.is_correct_order import IsCorrectOrder
 from filters.is_correct_person_amount import IsPersonAmount, TooManyPersons
+from handlers.api import BackendApi, BackendUnavailable
 from handlers.appsched import (one_day_before_iftar, no_reminder,
                                three_hours_before_iftar)
 from handlers.basic import (back_to_cafe_menu, back_to_date, back_to_name,
@@ -26,32 +25,45 @@ from handlers.basic import (back_to_cafe_menu, back_to_date, back_to_name,
                             main_cafe_menu, name_for_reserving,
                             no_free_table, person_per_table, route_to_cafe,
                             pay_again_other_cafe, wrong_input)
+from handlers.errors import backend_unavailable
 from handlers.pay import order, pre_checkout_query, succesfull_payment
+from keyboards.reply_keyboards import build_static_keyboards
+from middlewares.api_middleware import ApiMiddleware
 from middlewares.appshed_middelware import SchedulerMiddleware
+from middlewares.fsm_data_middleware import FsmDataMiddleware
+from middlewares.sunset_middleware import SunsetMiddleware
 from settings import settings
+from utils.cafe_directory import CafeDirectory
+from utils.dispatcher import MessageDispatcher
+from utils.notifier import AdminNotifier
+from utils.outbox import OutboxRelay
+from utils.router import ExactMatchRouter
+from utils.scheduler import create_scheduler, register_job_context
 from utils.states import StepsForm
+from utils.storage import create_isolation, create_storage
+from utils.sunset import SunsetService
+from utils.webhook import WebhookRunner
 
 
-async def start():
-    """Функция, запускающая работу бота."""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    bot = Bot(token=settings.bots.bot_token)
-
-    dp = Dispatcher(storage=MemoryStorage())
-    scheduler = AsyncIOScheduler(timezone='Asia/Yekaterinburg')
-    scheduler.start()
-    dp.update.middleware.register(SchedulerMiddleware(scheduler))
+def register_handlers(dp: Dispatcher, exact_match: bool = True):
+    """Регистрация обработчиков.
 
+    Кнопки с фиксированным текстом ищутся по словарю ExactMatchRouter,
+    остальные обработчики проверяются по порядку; фильтр состояния в них
+    стоит первым, чтобы дорогие фильтры не вызывались в чужих состояниях.
+    """
+    router = ExactMatchRouter(dp.message, enabled=exact_match)
+    dp.errors.register(
+        backend_unavailable,
+        ExceptionTypeFilter(BackendUnavailable)
+    )
     dp.message.register(
         get_start,
         Command(commands=['start', 'run'])
     )
-    dp.message.register(
+    router.message(
         order,
-        F.text == 'Оплатить через ЮКасса',
+        'Оплатить через ЮКасса',
         StepsForm.PAY_STATE
     )
     dp.pre_checkout_query.register(
@@ -60,174 +72,216 @@ async def start():
     )
     dp.message.register(
         pay_again_other_cafe,
-        IsTrueAdress(),
-        StepsForm.PAY_STATE
+        StepsForm.PAY_STATE,
+        IsTrueAdress()
     )
     dp.message.register(
         succesfull_payment,
-        F.successful_payment,
-        StepsForm.PAY_STATE
+        StepsForm.PAY_STATE,
+        F.successful_payment
     )
     dp.message.register(
         get_true_contact,
+        StepsForm.PHONE_STATE,
         F.contact,
-        IsTrueContact(),
-        StepsForm.PHONE_STATE
+        IsTrueContact()
     )
     dp.message.register(
         get_fake_contact,
         F.contact
     )
-    dp.message.register(
+    router.message(
         back_to_cafe_menu,
-        F.text == 'Назад',
-        or_f(
-            StepsForm.CHOOSE_DATE, StepsForm.CAFE_ADDRESS, StepsForm.MENU_WATCH
-        )
+        'Назад',
+        StepsForm.CHOOSE_DATE, StepsForm.CAFE_ADDRESS, StepsForm.MENU_WATCH
     )
-    dp.message.register(
+    router.message(
         back_to_date,
-        F.text == 'Назад ' + emojize(':calendar:'),
-        or_f(StepsForm.PERSON_AMOUNT, StepsForm.NO_FREE_TABLE)
+        'Назад ' + emojize(':calendar:'),
+        StepsForm.PERSON_AMOUNT, StepsForm.NO_FREE_TABLE
     )
-    dp.message.register(
+    router.message(
         back_to_persons,
-        F.text == 'Назад ' + emojize(':family:'),
+        'Назад ' + emojize(':family:'),
         StepsForm.NAME_STATE
     )
-    dp.message.register(
+    router.message(
         back_to_name,
-        F.text == 'Назад ' + emojize(':left_arrow:'),
+        'Назад ' + emojize(':left_arrow:'),
         StepsForm.PHONE_STATE
     )
-    dp.message.register(
+    router.message(
         back_to_no_table,
-        F.text == 'Назад ' + emojize(':reverse_button:'),
+        'Назад ' + emojize(':reverse_button:'),
         StepsForm.CHOOSE_ANOTHER_CAFE
     )
-    dp.message.register(
+    router.message(
         back_to_phone,
-        F.text == 'Назад ' + emojize(':mobile_phone:'),
+        'Назад ' + emojize(':mobile_phone:'),
         StepsForm.ORDER_STATE
     )
-    dp.message.register(
+    router.message(
         back_to_set,
-        F.text == 'Назад ' + emojize(':pot_of_food:'),
+        'Назад ' + emojize(':pot_of_food:'),
         StepsForm.ORDER_CHECK_PAY
     )
     dp.message.register(
         main_cafe_menu,
-        IsTrueAdress(),
-        StepsForm.CHOOSE_CAFE
+        StepsForm.CHOOSE_CAFE,
+        IsTrueAdress()
     )
-    dp.message.register(
+    router.message(
         back_to_start,
-        GoToStart()
+        MOVE_BACK_COMMANDS
     )
-    dp.message.register(
+    router.message(
         get_contacts,
-        F.text == 'Контакты и режим работы',
+        'Контакты и режим работы',
         StepsForm.CAFE_INFO
     )
-    dp.message.register(
+    router.message(
         cafe_menu,
-        F.text == 'Посмотреть меню',
+        'Посмотреть меню',
         StepsForm.CAFE_INFO
     )
-    dp.message.register(
+    router.message(
         route_to_cafe,
-        F.text == 'Как добраться',
+        'Как добраться',
         StepsForm.CAFE_INFO
     )
-    dp.message.register(
+    router.message(
         choose_date,
-        F.text == 'Забронировать стол',
-        or_f(
-            StepsForm.CAFE_INFO, StepsForm.CAFE_ADDRESS, StepsForm.MENU_WATCH
-        )
+        'Забронировать стол',
+        StepsForm.CAFE_INFO, StepsForm.CAFE_ADDRESS, StepsForm.MENU_WATCH
     )
-    dp.message.register(
+    router.message(
         choose_another_cafe,
-        F.text == 'Выбрать другое кафе',
+        'Выбрать другое кафе',
         StepsForm.NO_FREE_TABLE
     )
-    dp.message.register(
+    router.message(
         name_for_reserving,
-        F.text == 'Сдвигать столы',
+        'Сдвигать столы',
         StepsForm.NO_FREE_TABLE
     )
     dp.message.register(
         name_for_reserving,
-        IsAnotherCafe(),
-        StepsForm.CHOOSE_ANOTHER_CAFE
+        StepsForm.CHOOSE_ANOTHER_CAFE,
+        IsAnotherCafe()
     )
-    dp.message.register(
+    router.message(
         get_my_name,
-        F.text == 'На моё имя',
+        'На моё имя',
         StepsForm.NAME_STATE
     )
-    dp.message.register(
+    router.message(
         one_day_before_iftar,
-        F.text == 'За сутки',
+        'За сутки',
         StepsForm.REMINDER_STATE
     )
-    dp.message.register(
+    router.message(
         three_hours_before_iftar,
-        F.text == 'За 3 часа',
+        'За 3 часа',
         StepsForm.REMINDER_STATE
     )
-    dp.message.register(
+    router.message(
         no_reminder,
-        F.text == 'Не отправлять напоминание',
+        'Не отправлять напоминание',
         StepsForm.REMINDER_STATE
     )
     dp.message.register(
         get_phone,
-        F.text.regexp(r'^([А-Я]{1}[а-яё]{1,23}|[A-Z]{1}[a-z]{1,23})$'),
-        StepsForm.NAME_STATE
+        StepsForm.NAME_STATE,
+        F.text.regexp(r'^([А-Я]{1}[а-яё]{1,23}|[A-Z]{1}[a-z]{1,23})$')
     )
     dp.message.register(
         choose_set,
-        F.text.regexp(r'^((7|8|\+7)[\- ]?)?(\(?\d{3}\)?[\- ]?)?[\d\- ]{10}$'),
-        StepsForm.PHONE_STATE
+        StepsForm.PHONE_STATE,
+        F.text.regexp(r'^((7|8|\+7)[\- ]?)?(\(?\d{3}\)?[\- ]?)?[\d\- ]{10}$')
     )
-    dp.message.register(
+    router.message(
         check_order_go_to_pay,
-        F.text == 'Оплатить',
+        'Оплатить',
         StepsForm.ORDER_STATE
     )
-    dp.message.register(
+    router.message(
         choose_pay_method,
-        F.text == 'Перейти к оплате',
+        'Перейти к оплате',
         StepsForm.ORDER_CHECK_PAY
     )
     dp.message.register(
         confirm_order,
-        IsCorrectOrder(),
-        StepsForm.ORDER_STATE
+        StepsForm.ORDER_STATE,
+        IsCorrectOrder()
     )
     dp.message.register(
         person_per_table,
-        IsCorrectDate(),
-        StepsForm.CHOOSE_DATE
+        StepsForm.CHOOSE_DATE,
+        IsCorrectDate()
     )
     dp.message.register(
         no_free_table,
-        TooManyPersons(),
-        StepsForm.PERSON_AMOUNT
+        StepsForm.PERSON_AMOUNT,
+        TooManyPersons()
     )
     dp.message.register(
         name_for_reserving,
-        IsPersonAmount(),
-        or_f(StepsForm.PERSON_AMOUNT, StepsForm.CHOOSE_ANOTHER_CAFE)
+        or_f(StepsForm.PERSON_AMOUNT, StepsForm.CHOOSE_ANOTHER_CAFE),
+        IsPersonAmount()
     )
     dp.message.register(
         wrong_input
     )
 
+
+async def start():
+    """Функция, запускающая работу бота."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    build_static_keyboards()
+    bot = Bot(token=settings.bots.bot_token)
+    api = BackendApi(settings.backend)
+    await api.start()
+    directory = CafeDirectory(api, ttl=settings.backend.cafe_cache_ttl)
+    sunset = SunsetService(settings.sunset)
+    await sunset.start()
+    prefetch = asyncio.create_task(sunset.prefetch_ramadan())
+
+    storage = create_storage(settings.storage)
+    dp = Dispatcher(
+        storage=storage, events_isolation=create_isolation(storage)
+    )
+    message_dispatcher = MessageDispatcher(bot, settings.delivery)
+    message_dispatcher.start()
+    register_job_context(bot=bot, dispatcher=message_dispatcher)
+    notifier = AdminNotifier(api, message_dispatcher, settings.notifier)
+    scheduler = create_scheduler(settings.scheduler)
+    scheduler.start()
+    relay = OutboxRelay(
+        api, notifier, scheduler, sunset, settings.outbox
+    )
+    relay.start()
+    dp.update.middleware.register(SchedulerMiddleware(scheduler))
+    dp.update.middleware.register(ApiMiddleware(api, directory))
+    dp.update.middleware.register(SunsetMiddleware(sunset))
+    dp.update.middleware.register(FsmDataMiddleware())
+
+    register_handlers(dp)
+
     try:
-        await dp.start_polling(bot)
+        if settings.webhook.mode == 'webhook':
+            await WebhookRunner(dp, bot, settings.webhook).run()
+        else:
+            await dp.start_polling(bot)
     finally:
+        await relay.close()
+        scheduler.shutdown(wait=False)
+        await message_dispatcher.close()
+        prefetch.cancel()
+        await sunset.close()
+        await api.close()
         await bot.session.close()
 
 
@@ -0,0 +1,25 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types.base import TelegramObject
+
+from handlers.api import BackendApi
+from utils.cafe_directory import CafeDirectory
+
+
+class ApiMiddleware(BaseMiddleware):
+    def __init__(self, api: BackendApi, directory: CafeDirectory):
+        self.api = api
+        self.directory = directory
+
+    async def __call__(
+            self,
+            handler: Callable[
+                [TelegramObject, Dict[str, Any]], Awaitable[Any]
+            ],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        data['api'] = self.api
+        data['directory'] = self.directory
+        return await handler(event, data)
@@ -0,0 +1,34 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types.base import TelegramObject
+
+from utils.fsm_data import FsmData
+
+
+class FsmDataMiddleware(BaseMiddleware):
+    """Одно чтение данных FSM на обновление и одна запись изменений.
+
+    Обновления одного пользователя обрабатываются по очереди
+    (create_isolation), поэтому загруженные данные с изменениями
+    записываются целиком одним set_data, без повторного чтения.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[
+                [TelegramObject, Dict[str, Any]], Awaitable[Any]
+            ],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        state = data.get('state')
+        if state is None:
+            return await handler(event, data)
+        fsm_data = FsmData(await state.get_data())
+        data['fsm_data'] = fsm_data
+        try:
+            return await handler(event, data)
+        finally:
+            if fsm_data.changes:
+                await state.set_data(fsm_data.as_dict())
@@ -0,0 +1,22 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types.base import TelegramObject
+
+from utils.sunset import SunsetService
+
+
+class SunsetMiddleware(BaseMiddleware):
+    def __init__(self, sunset: SunsetService):
+        self.sunset = sunset
+
+    async def __call__(
+            self,
+            handler: Callable[
+                [TelegramObject, Dict[str, Any]], Awaitable[Any]
+            ],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        data['sunset'] = self.sunset
+        return await handler(event, data)
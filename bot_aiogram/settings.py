@@ -1,7 +1,21 @@
 from dataclasses import dataclass
+from datetime import date
+from typing import Optional
 
 from environs import Env
 
+# Таймауты запросов к бэкенду по методам BackendApi; для остальных
+# действует BACKEND_TIMEOUT.
+BACKEND_TIMEOUTS = {
+    'get_cafe': 3,
+    'get_cafe_admins': 3,
+    'post_quantity': 3,
+    'post_quantities': 5,
+    'post_hold': 5,
+    'confirm_reservation': 2,
+    'release_hold': 3,
+}
+
 
 @dataclass
 class Bots:
@@ -10,9 +24,90 @@ class Bots:
     provider_token: str
 
 
+@dataclass
+class Backend:
+    url: str
+    timeout: float
+    pool_size: int
+    keepalive_timeout: float
+    cafe_cache_ttl: float
+    retries: int
+    retry_backoff: float
+    timeouts: dict
+    breaker_threshold: int
+    breaker_reset: float
+
+
+@dataclass
+class Sunset:
+    url: str
+    timeout: float
+    cache_path: str
+    latitude: float
+    longitude: float
+    timezone: str
+    ramadan_start: Optional[date]
+    ramadan_end: Optional[date]
+
+
+@dataclass
+class Scheduler:
+    jobstore_url: str
+    timezone: str
+    misfire_grace_time: int
+
+
+@dataclass
+class Delivery:
+    global_rate: float
+    chat_rate: float
+    workers: int
+    max_attempts: int
+    report_interval: float
+
+
+@dataclass
+class Notifier:
+    admins_ttl: float
+
+
+@dataclass
+class Outbox:
+    poll_interval: float
+    batch_size: int
+    lease: int
+
+
+@dataclass
+class Storage:
+    backend: str
+    url: str
+    ttl: Optional[int]
+
+
+@dataclass
+class Webhook:
+    mode: str
+    url: str
+    path: str
+    secret: str
+    host: str
+    port: int
+    max_concurrency: int
+    drain_timeout: float
+
+
 @dataclass
 class Settings:
     bots: Bots
+    backend: Backend
+    sunset: Sunset
+    scheduler: Scheduler
+    delivery: Delivery
+    notifier: Notifier
+    outbox: Outbox
+    storage: Storage
+    webhook: Webhook
 
 
 def get_settings(path: str):
@@ -24,6 +119,67 @@ def get_settings(path: str):
             bot_token=env.str('TOKEN'),
             admin_id=env.int('ADMIN_ID'),
             provider_token=env.str('PROVIDER_TOKEN'),
+        ),
+        backend=Backend(
+            url=env.str('BACKEND_URL', 'http://backend:8000'),
+            timeout=env.float('BACKEND_TIMEOUT', 10),
+            pool_size=env.int('BACKEND_POOL_SIZE', 20),
+            keepalive_timeout=env.float('BACKEND_KEEPALIVE_TIMEOUT', 30),
+            cafe_cache_ttl=env.float('CAFE_CACHE_TTL', 300),
+            retries=env.int('BACKEND_RETRIES', 3),
+            retry_backoff=env.float('BACKEND_RETRY_BACKOFF', 0.2),
+            timeouts=env.dict(
+                'BACKEND_TIMEOUTS', BACKEND_TIMEOUTS, subcast_values=float
+            ),
+            breaker_threshold=env.int('BACKEND_BREAKER_THRESHOLD', 5),
+            breaker_reset=env.float('BACKEND_BREAKER_RESET', 30),
+        ),
+        sunset=Sunset(
+            url=env.str('SUNSET_API_URL', ''),
+            timeout=env.float('SUNSET_TIMEOUT', 5),
+            cache_path=env.str('SUNSET_CACHE_PATH', 'cache/sunset.json'),
+            latitude=env.float('SUNSET_LATITUDE', 55.78874),
+            longitude=env.float('SUNSET_LONGITUDE', 49.12214),
+            timezone=env.str('SUNSET_TIMEZONE', 'Europe/Moscow'),
+            ramadan_start=env.date('RAMADAN_START', None),
+            ramadan_end=env.date('RAMADAN_END', None),
+        ),
+        scheduler=Scheduler(
+            jobstore_url=env.str(
+                'SCHEDULER_JOBSTORE_URL', 'sqlite:///cache/jobs.sqlite'
+            ),
+            timezone=env.str('SCHEDULER_TIMEZONE', 'Asia/Yekaterinburg'),
+            misfire_grace_time=env.int('SCHEDULER_MISFIRE_GRACE_TIME', 3600),
+        ),
+        delivery=Delivery(
+            global_rate=env.float('DELIVERY_GLOBAL_RATE', 25),
+            chat_rate=env.float('DELIVERY_CHAT_RATE', 1),
+            workers=env.int('DELIVERY_WORKERS', 8),
+            max_attempts=env.int('DELIVERY_MAX_ATTEMPTS', 5),
+            report_interval=env.float('DELIVERY_REPORT_INTERVAL', 60),
+        ),
+        notifier=Notifier(
+            admins_ttl=env.float('ADMINS_CACHE_TTL', 300),
+        ),
+        outbox=Outbox(
+            poll_interval=env.float('OUTBOX_POLL_INTERVAL', 2),
+            batch_size=env.int('OUTBOX_BATCH_SIZE', 100),
+            lease=env.int('OUTBOX_LEASE', 60),
+        ),
+        storage=Storage(
+            backend=env.str('FSM_STORAGE', 'memory'),
+            url=env.str('FSM_STORAGE_URL', 'sqlite:///cache/fsm.sqlite'),
+            ttl=env.int('FSM_STORAGE_TTL', 86400) or None,
+        ),
+        webhook=Webhook(
+            mode=env.str('BOT_MODE', 'polling'),
+            url=env.str('WEBHOOK_URL', ''),
+            path=env.str('WEBHOOK_PATH', '/webhook'),
+            secret=env.str('WEBHOOK_SECRET', ''),
+            host=env.str('WEBHOOK_HOST', '0.0.0.0'),
+            port=env.int('WEBHOOK_PORT', 8080),
+            max_concurrency=env.int('WEBHOOK_MAX_CONCURRENCY', 40),
+            drain_timeout=env.float('WEBHOOK_DRAIN_TIMEOUT', 30),
         )
     )
 
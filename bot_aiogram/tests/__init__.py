@@ -0,0 +1,8 @@
+"""Тесты бота. Запуск из каталога bot_aiogram: python -m unittest"""
+import os
+
+# settings читает обязательные переменные при импорте.
+for name, value in (
+    ('TOKEN', '1:test'), ('ADMIN_ID', '1'), ('PROVIDER_TOKEN', 'test')
+):
+    os.environ.setdefault(name, value)
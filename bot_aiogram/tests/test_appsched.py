@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from handlers.appsched import schedule_reminder, skip_reminder
+
+REMINDER = {
+    'name': 'Гость', 'address': 'ул. А', 'date': '11.03.2030',
+    'guests': '2', 'phone': '1',
+}
+
+
+class ReminderJobsTest(TestCase):
+
+    def setUp(self):
+        self.scheduler = BackgroundScheduler()
+        self.scheduler.start(paused=True)
+        self.addCleanup(self.scheduler.shutdown, wait=False)
+        self.run_date = datetime.now() + timedelta(days=1)
+
+    def schedule(self, chat_id, reservation_id):
+        schedule_reminder(
+            self.scheduler, self.run_date, chat_id, reservation_id,
+            '3_hours', REMINDER
+        )
+
+    def test_one_job_per_reservation(self):
+        self.schedule(1, 10)
+        self.schedule(2, 11)
+        self.schedule(1, 10)
+        self.assertEqual(
+            sorted(job.id for job in self.scheduler.get_jobs()),
+            ['reminder-10', 'reminder-11']
+        )
+
+    def test_reservation_without_id_is_skipped(self):
+        self.schedule(1, 10)
+        with self.assertLogs(level='ERROR'):
+            self.schedule(2, None)
+            skip_reminder(self.scheduler, self.run_date, None)
+        self.assertEqual(
+            [job.id for job in self.scheduler.get_jobs()], ['reminder-10']
+        )
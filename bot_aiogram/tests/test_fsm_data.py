@@ -0,0 +1,51 @@
+from unittest import IsolatedAsyncioTestCase
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from middlewares.fsm_data_middleware import FsmDataMiddleware
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=2)
+
+
+class CountingStorage(MemoryStorage):
+    """MemoryStorage, который запоминает обращения к данным."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    async def get_data(self, key):
+        self.calls.append('get_data')
+        return await super().get_data(key)
+
+    async def set_data(self, key, data):
+        self.calls.append('set_data')
+        await super().set_data(key, data)
+
+
+class FsmDataMiddlewareTest(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.storage = CountingStorage()
+        await self.storage.set_data(KEY, {'name': 'Гость', 'date': None})
+        self.storage.calls.clear()
+        self.state = FSMContext(self.storage, KEY)
+
+    async def run_handler(self, **changes):
+        async def handler(event, data):
+            data['fsm_data'].update(**changes)
+        await FsmDataMiddleware()(handler, None, {'state': self.state})
+
+    async def test_one_read_and_one_write(self):
+        await self.run_handler(date='11.03.2024', name='Гость')
+        self.assertEqual(self.storage.calls, ['get_data', 'set_data'])
+        self.assertEqual(
+            await self.storage.get_data(KEY),
+            {'name': 'Гость', 'date': '11.03.2024'}
+        )
+
+    async def test_no_write_without_changes(self):
+        await self.run_handler(name='Гость')
+        self.assertEqual(self.storage.calls, ['get_data'])
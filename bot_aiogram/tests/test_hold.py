@@ -0,0 +1,57 @@
+from unittest import IsolatedAsyncioTestCase
+
+from handlers.api import NotFound
+from handlers.basic import CAFE_GONE, hold_tables
+from utils.cafe_directory import CafeDirectory
+from utils.fsm_data import FsmData
+
+CAFES = [{'id': 1, 'address': 'ул. А', 'number': '1'}]
+FSM_DATA = {
+    'address': 'ул. А', 'date': '11.03.2030', 'person_amount': '2',
+    'name': 'Гость', 'phone': '89000000000', 'data_sets': {'1': 1},
+}
+
+
+class HoldApi:
+    """Бэкенд, который отвечает на удержание заданным ответом."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.cafe_requests = 0
+
+    async def get_cafe(self):
+        self.cafe_requests += 1
+        return CAFES
+
+    async def post_hold(self, cafe_id, data, idempotency_key=None):
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+class HoldTablesTest(IsolatedAsyncioTestCase):
+
+    async def hold(self, answer):
+        self.api = HoldApi(answer)
+        directory = CafeDirectory(self.api, ttl=3600)
+        result = await hold_tables(
+            self.api, directory, FsmData(dict(FSM_DATA)), 1, 'key'
+        )
+        await directory.get_all()
+        return result
+
+    async def test_held(self):
+        answer = await self.hold({'id': 5, 'status': 'held'})
+        self.assertEqual(answer['id'], 5)
+        self.assertEqual(self.api.cafe_requests, 1)
+
+    async def test_missing_cafe_resets_directory(self):
+        answer = await self.hold(NotFound('POST /cafes/1/reservations/hold/'))
+        self.assertIs(answer, CAFE_GONE)
+        self.assertEqual(self.api.cafe_requests, 2)
+
+    async def test_other_errors_keep_directory(self):
+        forbidden = {'detail': 'У вас недостаточно прав.'}
+        answer = await self.hold(forbidden)
+        self.assertIs(answer, forbidden)
+        self.assertEqual(self.api.cafe_requests, 1)
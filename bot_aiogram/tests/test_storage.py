@@ -0,0 +1,137 @@
+import tempfile
+import time
+from unittest import IsolatedAsyncioTestCase, skipUnless
+from unittest.mock import patch
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from settings import Storage
+from utils.states import StepsForm
+from utils.storage import SqlStorage, create_storage
+
+try:
+    from fakeredis.aioredis import FakeRedis
+except ImportError:
+    FakeRedis = None
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=2)
+OTHER_KEY = StorageKey(bot_id=1, chat_id=3, user_id=3)
+TTL = 60
+
+
+class FakeClock:
+    """Подменяет time в utils.storage, чтобы проверить срок жизни."""
+
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return time.monotonic()
+
+
+class SqlStorageTest(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.clock = FakeClock()
+        clock = patch('utils.storage.time', self.clock)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.storage = create_storage(Storage('sql', 'sqlite://', TTL))
+
+    async def asyncTearDown(self):
+        await self.storage.close()
+
+    def test_backend(self):
+        self.assertIsInstance(self.storage, SqlStorage)
+
+    async def test_state(self):
+        self.assertIsNone(await self.storage.get_state(KEY))
+        await self.storage.set_state(KEY, StepsForm.CHOOSE_DATE)
+        self.assertEqual(
+            await self.storage.get_state(KEY), StepsForm.CHOOSE_DATE.state
+        )
+        await self.storage.set_state(KEY, None)
+        self.assertIsNone(await self.storage.get_state(KEY))
+
+    async def test_data(self):
+        self.assertEqual(await self.storage.get_data(KEY), {})
+        data = {'name': 'Гость', 'data_sets': {'1': 2}}
+        await self.storage.set_data(KEY, data)
+        await self.storage.set_state(KEY, StepsForm.ORDER_STATE)
+        self.assertEqual(await self.storage.get_data(KEY), data)
+        self.assertEqual(await self.storage.get_data(OTHER_KEY), {})
+
+    async def test_expired_conversation_starts_from_scratch(self):
+        await self.storage.set_state(KEY, StepsForm.ORDER_STATE)
+        await self.storage.set_data(KEY, {'name': 'Гость'})
+        self.clock.now += TTL + 1
+        self.assertIsNone(await self.storage.get_state(KEY))
+        self.assertEqual(await self.storage.get_data(KEY), {})
+        await self.storage.set_state(KEY, StepsForm.CHOOSE_CAFE)
+        self.assertEqual(await self.storage.get_data(KEY), {})
+
+    async def test_write_extends_ttl(self):
+        await self.storage.set_data(KEY, {'name': 'Гость'})
+        self.clock.now += TTL - 1
+        await self.storage.set_state(KEY, StepsForm.NAME_STATE)
+        self.clock.now += TTL - 1
+        self.assertEqual(await self.storage.get_data(KEY), {'name': 'Гость'})
+
+    async def test_close_keeps_data_in_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            url = f'sqlite:///{directory}/cache/fsm.sqlite'
+            storage = SqlStorage(url, ttl=TTL)
+            await storage.set_data(KEY, {'name': 'Гость'})
+            await storage.close()
+            storage = SqlStorage(url, ttl=TTL)
+            self.assertEqual(await storage.get_data(KEY), {'name': 'Гость'})
+            await storage.close()
+
+
+class CreateStorageTest(IsolatedAsyncioTestCase):
+
+    def test_memory(self):
+        self.assertIsInstance(
+            create_storage(Storage('memory', '', None)), MemoryStorage
+        )
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_storage(Storage('files', '', None))
+
+
+@skipUnless(FakeRedis, 'нужен fakeredis')
+class RedisStorageTest(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.redis = FakeRedis()
+        with patch(
+            'aiogram.fsm.storage.redis.Redis',
+            lambda connection_pool: self.redis
+        ):
+            self.storage = create_storage(
+                Storage('redis', 'redis://localhost', TTL)
+            )
+
+    async def asyncTearDown(self):
+        await self.storage.close()
+
+    async def test_state_and_data(self):
+        await self.storage.set_state(KEY, StepsForm.ORDER_STATE)
+        await self.storage.set_data(KEY, {'name': 'Гость'})
+        self.assertEqual(
+            await self.storage.get_state(KEY), StepsForm.ORDER_STATE.state
+        )
+        self.assertEqual(await self.storage.get_data(KEY), {'name': 'Гость'})
+
+    async def test_keys_expire_and_data_is_compact(self):
+        await self.storage.set_data(KEY, {'name': 'Гость'})
+        data_key = self.storage.key_builder.build(KEY, 'data')
+        self.assertTrue(0 < await self.redis.ttl(data_key) <= TTL)
+        self.assertEqual(
+            await self.redis.get(data_key), '{"name":"Гость"}'.encode()
+        )
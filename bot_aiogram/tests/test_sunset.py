@@ -0,0 +1,63 @@
+import os
+import tempfile
+from datetime import date, datetime, timezone
+from unittest import IsolatedAsyncioTestCase
+from zoneinfo import ZoneInfo
+
+from settings import Sunset
+from utils.sunset import TIME_FORMAT, SunsetService
+
+# Екатеринбург: закат 11.03.2024 в 13:52:28 UTC (astral 3.2).
+LATITUDE, LONGITUDE = 56.83892, 60.6057
+DAY = date(2024, 3, 11)
+SUNSET_UTC = datetime(2024, 3, 11, 13, 52, 28, tzinfo=timezone.utc)
+CAFE_TIMEZONE = 'Asia/Yekaterinburg'
+
+
+class FakeApiSunsetService(SunsetService):
+    """Ответы как у api.sunrisesunset.io.
+
+    Без параметра timezone время местное для координат, с ним — в
+    указанном часовом поясе.
+    """
+
+    async def _get_json(self, params):
+        tz = ZoneInfo(params.get('timezone', CAFE_TIMEZONE))
+        sunset = SUNSET_UTC.astimezone(tz).strftime(TIME_FORMAT)
+        return {'results': {'sunset': sunset}}
+
+
+class SunsetServiceTest(IsolatedAsyncioTestCase):
+
+    def config(self, url):
+        return Sunset(
+            url=url, timeout=1,
+            cache_path=os.path.join(self.directory.name, 'sunset.json'),
+            latitude=55.78874, longitude=49.12214, timezone='Europe/Moscow',
+            ramadan_start=None, ramadan_end=None
+        )
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    async def both_paths(self, cafe_timezone):
+        from_api = await FakeApiSunsetService(
+            self.config('http://sunset.test/json')
+        ).sunset(DAY, LATITUDE, LONGITUDE, cafe_timezone)
+        local = await SunsetService(self.config('')).sunset(
+            DAY, LATITUDE, LONGITUDE, cafe_timezone
+        )
+        return from_api, local
+
+    async def test_api_and_local_agree_for_cafe_timezone(self):
+        from_api, local = await self.both_paths(CAFE_TIMEZONE)
+        self.assertEqual(from_api.utcoffset(), local.utcoffset())
+        self.assertEqual(from_api.hour, 18)
+        self.assertLess(abs((from_api - local).total_seconds()), 60)
+
+    async def test_default_timezone_is_used_by_both_paths(self):
+        from_api, local = await self.both_paths(None)
+        self.assertEqual(from_api.tzinfo, ZoneInfo('Europe/Moscow'))
+        self.assertEqual(from_api.hour, 16)
+        self.assertLess(abs((from_api - local).total_seconds()), 60)
@@ -0,0 +1,61 @@
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Выключатель для запросов к сервису, который перестал отвечать.
+
+    После failure_threshold неудач подряд выключатель размыкается и
+    запросы сразу отклоняются. Через reset_timeout секунд пропускается
+    один пробный запрос: успех замыкает выключатель, неудача размыкает
+    его снова. Если проба не отчиталась за reset_timeout (например,
+    запрос отменили), пропускается следующая.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = None
+        self._probe_at = None
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return CLOSED
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return OPEN
+        return HALF_OPEN
+
+    def allow(self) -> bool:
+        """Можно ли отправить запрос; в half-open — только пробный."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == OPEN:
+            return False
+        now = time.monotonic()
+        if (
+            self._probe_at is not None
+            and now - self._probe_at < self.reset_timeout
+        ):
+            return False
+        self._probe_at = now
+        return True
+
+    def success(self):
+        self.failures = 0
+        self._opened_at = None
+        self._probe_at = None
+
+    def failure(self):
+        self.failures += 1
+        self._probe_at = None
+        if (
+            self._opened_at is not None
+            or self.failures >= self.failure_threshold
+        ):
+            self._opened_at = time.monotonic()
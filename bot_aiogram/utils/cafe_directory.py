@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import time
+
+from handlers.api import BackendApi
+from keyboards.reply_keyboards import clear_cafe_keyboards
+
+
+class CafeDirectory:
+    """Кэш списка кафе с индексами по адресу и id.
+
+    По истечении ttl отдаются устаревшие данные, а список обновляется
+    в фоне; invalidate() сбрасывает кэш до следующего запроса.
+    """
+
+    def __init__(self, api: BackendApi, ttl: float):
+        self.api = api
+        self.ttl = ttl
+        self._cafes = None
+        self._by_address = {}
+        self._by_id = {}
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task = None
+
+    async def get_all(self):
+        """Список кафе в порядке, который отдаёт бэкенд."""
+        if self._cafes is None:
+            await self.refresh()
+        elif time.monotonic() - self._loaded_at > self.ttl:
+            self._refresh_in_background()
+        return self._cafes
+
+    async def by_address(self, address):
+        await self.get_all()
+        return self._by_address.get(address)
+
+    async def by_id(self, cafe_id):
+        await self.get_all()
+        return self._by_id.get(int(cafe_id))
+
+    async def refresh(self):
+        """Загрузить список кафе, если его не обновили параллельно."""
+        loaded_at = self._loaded_at
+        async with self._lock:
+            if self._cafes is not None and self._loaded_at != loaded_at:
+                return
+            cafes = await self.api.get_cafe()
+            if cafes != self._cafes:
+                clear_cafe_keyboards()
+            self._by_address = {cafe['address']: cafe for cafe in cafes}
+            self._by_id = {cafe['id']: cafe for cafe in cafes}
+            self._cafes = cafes
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        self._cafes = None
+        self._loaded_at = 0.0
+
+    def _refresh_in_background(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._safe_refresh())
+
+    async def _safe_refresh(self):
+        try:
+            await self.refresh()
+        except Exception:
+            logging.exception('Не удалось обновить список кафе')
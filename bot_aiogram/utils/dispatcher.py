@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from aiogram import Bot
+from aiogram.exceptions import (TelegramBadRequest, TelegramForbiddenError,
+                                TelegramNetworkError, TelegramNotFound,
+                                TelegramRetryAfter, TelegramServerError)
+
+from settings import Delivery
+
+# Ошибки, после которых сообщение имеет смысл отправить ещё раз.
+RETRYABLE_ERRORS = (TelegramNetworkError, TelegramServerError)
+# Ошибки, после которых отправлять это сообщение бессмысленно: бот
+# заблокирован, чата нет или запрос неверен.
+PERMANENT_ERRORS = (
+    TelegramForbiddenError, TelegramBadRequest, TelegramNotFound
+)
+# Результаты отправки, которые получает future из submit().
+SENT = 'sent'
+REJECTED = 'rejected'
+FAILED = 'failed'
+# Сколько последних задержек доставки хранить для метрик.
+LAG_WINDOW = 1000
+# После скольких чатов забывать вёдра тех, кто давно ничего не получал.
+CHAT_BUCKETS_LIMIT = 10000
+
+
+class TokenBucket:
+    """Ведро токенов, в котором можно брать токены в долг.
+
+    reserve() сразу списывает токен и возвращает, сколько секунд нужно
+    подождать, чтобы уложиться в заданную частоту.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def is_full(self):
+        elapsed = time.monotonic() - self.updated
+        return self.tokens + elapsed * self.rate >= self.capacity
+
+
+@dataclass
+class Outgoing:
+    chat_id: int
+    text: str
+    kwargs: dict
+    done: asyncio.Future
+    queued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+
+class MessageDispatcher:
+    """Очередь исходящих сообщений с ограничением частоты отправки.
+
+    Соблюдает общий лимит бота и лимит на один чат, а при
+    TelegramRetryAfter приостанавливает все отправки на указанное время.
+    Задания планировщика, сработавшие одновременно, только ставят
+    сообщения в очередь и сразу завершаются.
+    """
+
+    def __init__(self, bot: Bot, config: Delivery):
+        self.bot = bot
+        self.config = config
+        self.queue = asyncio.Queue()
+        self._global = TokenBucket(config.global_rate, 1)
+        self._chats = {}
+        self._paused_until = 0.0
+        self._workers = []
+        self._reporter = None
+        self._lags = deque(maxlen=LAG_WINDOW)
+        self._sent_at = deque()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def start(self):
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.config.workers)
+        ]
+        if self.config.report_interval:
+            self._reporter = asyncio.create_task(self._report())
+
+    async def close(self, timeout: float = 5):
+        """Дождаться отправки очереди, но не дольше timeout секунд."""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(
+                'Не отправлено сообщений: %s', self.queue.qsize()
+            )
+        for task in [*self._workers, self._reporter]:
+            if task is not None:
+                task.cancel()
+
+    def submit(self, chat_id: int, text: str, **kwargs) -> asyncio.Future:
+        """Поставить сообщение в очередь; отправка произойдёт в фоне.
+
+        Возвращает future с результатом: SENT после доставки, REJECTED,
+        если Telegram отклонил сообщение окончательно, и FAILED, если
+        отправить не удалось из-за временных ошибок и её стоит повторить.
+        Ждать его не обязательно.
+        """
+        done = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait(Outgoing(chat_id, text, kwargs, done))
+        return done
+
+    def stats(self):
+        """Пропускная способность за минуту и задержки доставки."""
+        now = time.monotonic()
+        while self._sent_at and now - self._sent_at[0] > 60:
+            self._sent_at.popleft()
+        lags = sorted(self._lags)
+        return {
+            'queued': self.queue.qsize(),
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'per_second': len(self._sent_at) / 60,
+            'lag_p50': lags[len(lags) // 2] if lags else 0.0,
+            'lag_p95': lags[int(len(lags) * 0.95)] if lags else 0.0,
+            'lag_max': lags[-1] if lags else 0.0,
+        }
+
+    async def _worker(self):
+        while True:
+            message = await self.queue.get()
+            result = FAILED
+            try:
+                await self._deliver(message)
+                result = SENT
+            except PERMANENT_ERRORS as error:
+                self.failed += 1
+                result = REJECTED
+                logging.warning(
+                    'Telegram отклонил сообщение в чат %s: %s',
+                    message.chat_id, error
+                )
+            except Exception:
+                self.failed += 1
+                logging.exception(
+                    'Не удалось отправить сообщение в чат %s',
+                    message.chat_id
+                )
+            finally:
+                if not message.done.done():
+                    message.done.set_result(result)
+                self.queue.task_done()
+
+    async def _deliver(self, message: Outgoing):
+        while True:
+            await self._wait_turn(message.chat_id)
+            message.attempts += 1
+            try:
+                await self.bot.send_message(
+                    chat_id=message.chat_id, text=message.text,
+                    **message.kwargs
+                )
+            except TelegramRetryAfter as error:
+                self.retried += 1
+                self._paused_until = max(
+                    self._paused_until, time.monotonic() + error.retry_after
+                )
+                logging.warning(
+                    'Telegram просит подождать %s с', error.retry_after
+                )
+            except RETRYABLE_ERRORS:
+                if message.attempts >= self.config.max_attempts:
+                    raise
+                self.retried += 1
+                await asyncio.sleep(2 ** message.attempts)
+            else:
+                now = time.monotonic()
+                self.sent += 1
+                self._sent_at.append(now)
+                self._lags.append(now - message.queued_at)
+                return
+
+    async def _wait_turn(self, chat_id):
+        """Дождаться паузы RetryAfter и токенов общего и чатового вёдер."""
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            if len(self._chats) > CHAT_BUCKETS_LIMIT:
+                self._chats = {
+                    key: bucket for key, bucket in self._chats.items()
+                    if not bucket.is_full()
+                }
+            chat = self._chats[chat_id] = TokenBucket(
+                self.config.chat_rate, 1
+            )
+        delay = max(self._global.reserve(), chat.reserve())
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _report(self):
+        reported = 0
+        while True:
+            await asyncio.sleep(self.config.report_interval)
+            if self.sent == reported and not self.queue.qsize():
+                continue
+            reported = self.sent
+            logging.info(
+                'Рассылка: %(sent)s отправлено, %(failed)s ошибок, '
+                '%(retried)s повторов, в очереди %(queued)s, '
+                '%(per_second).1f сообщ/с, задержка p50 %(lag_p50).1f с, '
+                'p95 %(lag_p95).1f с, max %(lag_max).1f с',
+                self.stats()
+            )
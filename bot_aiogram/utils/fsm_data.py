@@ -0,0 +1,22 @@
+class FsmData:
+    """Данные FSM, загруженные один раз на обновление.
+
+    Обработчики читают и меняют их без обращений к хранилищу;
+    FsmDataMiddleware записывает их в конце, если changes не пуст.
+    """
+
+    def __init__(self, data: dict):
+        self._data = data
+        self.changes = {}
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def update(self, **kwargs):
+        for key, value in kwargs.items():
+            if key not in self._data or self._data[key] != value:
+                self._data[key] = value
+                self.changes[key] = value
+
+    def as_dict(self):
+        return dict(self._data)
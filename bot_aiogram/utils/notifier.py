@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+from handlers.api import BackendApi
+from settings import Notifier
+from utils.dispatcher import FAILED, MessageDispatcher
+
+
+class AdminNotifier:
+    """Уведомления администраторам кафе.
+
+    Списки админов кэшируются по кафе на ttl секунд, а одновременные
+    запросы списка одного кафе ждут одну загрузку. Сами сообщения
+    отправляет MessageDispatcher: параллельно, с учётом лимитов Telegram
+    и независимо для каждого админа.
+    """
+
+    def __init__(
+            self, api: BackendApi, dispatcher: MessageDispatcher,
+            config: Notifier
+    ):
+        self.api = api
+        self.dispatcher = dispatcher
+        self.config = config
+        self._admins = {}
+        self._loading = {}
+
+    async def deliver(self, cafe_id: int, text: str, admins=None) -> set:
+        """Отправить text админам кафе и дождаться результата.
+
+        admins ограничивает рассылку, например теми, кому не дошла прошлая
+        попытка. Возвращает админов, которым отправку стоит повторить;
+        если Telegram отклонил сообщение окончательно (бот заблокирован,
+        чата нет), повторять его бессмысленно и админ не возвращается.
+        """
+        if admins is None:
+            admins = await self.admins(cafe_id)
+        results = await asyncio.gather(*(
+            self.dispatcher.submit(admin, text) for admin in admins
+        ))
+        return {
+            admin for admin, result in zip(admins, results)
+            if result == FAILED
+        }
+
+    async def admins(self, cafe_id: int):
+        """Telegram id админов кафе из кэша или одним запросом к бэкенду."""
+        cached = self._admins.get(cafe_id)
+        if cached is not None and time.monotonic() < cached[0]:
+            return cached[1]
+        loading = self._loading.get(cafe_id)
+        if loading is None:
+            loading = asyncio.ensure_future(self._load_admins(cafe_id))
+            self._loading[cafe_id] = loading
+            loading.add_done_callback(
+                lambda _: self._loading.pop(cafe_id, None)
+            )
+        return await asyncio.shield(loading)
+
+    async def _load_admins(self, cafe_id):
+        answer = await self.api.get_cafe_admins(cafe_id)
+        admins = [
+            admin['telegram'] for admin in answer['admins']
+            if admin['telegram']
+        ]
+        self._admins[cafe_id] = (
+            time.monotonic() + self.config.admins_ttl, admins
+        )
+        return admins
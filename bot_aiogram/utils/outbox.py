@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from datetime import date
+
+from apscheduler.jobstores.base import ConflictingIdError
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from handlers.api import BackendApi, BackendUnavailable
+from handlers.appsched import reminder_time, schedule_reminder
+from settings import Outbox
+from utils.notifier import AdminNotifier
+from utils.sunset import SunsetService
+
+# Напоминание, которое ставится до того, как клиент выбрал своё.
+DEFAULT_REMINDER = '3_hours'
+# Ошибки бэкенда, после которых опрос продолжается со следующей попытки.
+BACKEND_ERRORS = (BackendUnavailable,)
+
+
+def order_text(payload: dict):
+    """Текст уведомления админам о новой брони."""
+    day = date.fromisoformat(payload['date'])
+    text = (
+        'Поступил заказ:\n'
+        f'Имя: {payload["name"]}\n'
+        f'Телефон: {payload["number"]}\n'
+        f'Дата: {day:%d.%m.%Y}\n'
+        f'Адрес: {payload["cafe"]["address"]}\n'
+        f'Количество гостей: {payload["quantity"]}\n'
+    )
+    for order in payload['sets']:
+        text += f'Сет №{order["sets"]} в количестве {order["quantity"]} шт.\n'
+    text += f'Общая стоимость: {payload["total_price"]} руб.'
+    return text
+
+
+class OutboxRelay:
+    """Доставка событий, которые бэкенд записал вместе с бронью.
+
+    Забирает события пачками, для каждой брони уведомляет админов и
+    ставит напоминание по умолчанию, после чего подтверждает всю пачку
+    одним запросом. Необработанные события бэкенд выдаст снова, поэтому
+    доставка гарантирована «хотя бы один раз»: напоминание ставится
+    идемпотентно по id брони, а повторная попытка уходит только тем
+    админам, которым прошлая не дошла из-за временной ошибки.
+    """
+
+    def __init__(
+            self, api: BackendApi, notifier: AdminNotifier,
+            apscheduler: AsyncIOScheduler, sunset: SunsetService,
+            config: Outbox
+    ):
+        self.api = api
+        self.notifier = notifier
+        self.apscheduler = apscheduler
+        self.sunset = sunset
+        self.config = config
+        self._task = None
+        self._pending_admins = {}
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def relay_batch(self):
+        """Обработать одну пачку событий; возвращает их количество."""
+        answer = await self.api.claim_outbox(
+            self.config.batch_size, self.config.lease
+        )
+        events = answer['events']
+        handled = await asyncio.gather(
+            *(self._handle(event) for event in events)
+        )
+        done = [event['id'] for event, ok in zip(events, handled) if ok]
+        if done:
+            await self.api.ack_outbox(done)
+        return len(events)
+
+    async def _run(self):
+        while True:
+            try:
+                count = await self.relay_batch()
+            except BACKEND_ERRORS as error:
+                logging.warning('Бэкенд не выдал события: %r', error)
+                count = 0
+            except Exception:
+                logging.exception('Ошибка обработки событий')
+                count = 0
+            if count < self.config.batch_size:
+                await asyncio.sleep(self.config.poll_interval)
+
+    async def _handle(self, event):
+        if event['kind'] != 'reservation_created':
+            return True
+        payload = event['payload']
+        try:
+            await self._schedule_reminder(payload)
+            pending = await self.notifier.deliver(
+                payload['cafe']['id'], order_text(payload),
+                self._pending_admins.get(event['id'])
+            )
+        except Exception:
+            logging.exception(
+                'Не удалось обработать событие %s', event['id']
+            )
+            return False
+        if pending:
+            self._pending_admins[event['id']] = pending
+            return False
+        self._pending_admins.pop(event['id'], None)
+        return True
+
+    async def _schedule_reminder(self, payload):
+        """Поставить напоминание, если клиент ещё не выбрал своё.
+
+        Выбор клиента, в том числе отказ от напоминания (skip_reminder),
+        уже занимает id задания, и тогда ничего не меняется.
+        """
+        if payload['chat_id'] is None:
+            return
+        cafe = payload['cafe']
+        day = date.fromisoformat(payload['date'])
+        iftar_time = await self.sunset.sunset(
+            day, cafe['latitude'], cafe['longitude'], cafe.get('timezone')
+        )
+        reminder = {
+            'name': payload['name'],
+            'address': cafe['address'],
+            'date': day.strftime('%d.%m.%Y'),
+            'guests': payload['quantity'],
+            'phone': cafe['number'],
+        }
+        try:
+            schedule_reminder(
+                self.apscheduler, reminder_time(DEFAULT_REMINDER, iftar_time),
+                payload['chat_id'], payload['reservation'], DEFAULT_REMINDER,
+                reminder, replace_existing=False
+            )
+        except ConflictingIdError:
+            pass
@@ -0,0 +1,72 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, F
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.dispatcher.event.telegram import TelegramEventObserver
+from aiogram.filters import StateFilter
+from aiogram.types import Message
+
+ANY_STATE = '*'
+
+
+class ExactMatchRouter(BaseMiddleware):
+    """Обработчики кнопок, найденные по словарю (состояние, текст).
+
+    Работает как внешний middleware для dp.message: если для текущего
+    состояния и текста сообщения есть обработчик, он вызывается сразу,
+    минуя цепочку фильтров остальных обработчиков. Поэтому добавлять сюда
+    можно только кнопки, текст которых не совпадает с вводом, который
+    ждут фильтры зарегистрированных выше обработчиков (адреса, даты).
+
+    Для каждого сообщения в data кладётся filter_cache — словарь для
+    cached_filter. С enabled=False обработчики регистрируются в observer
+    обычными фильтрами F.text в том же порядке, для сравнения в бенчмарке.
+    """
+
+    def __init__(self, observer: TelegramEventObserver, enabled=True):
+        self.observer = observer
+        self.enabled = enabled
+        self._routes = {}
+        observer.outer_middleware.register(self)
+
+    def message(self, callback, texts, *states):
+        """Зарегистрировать обработчик кнопок texts в состояниях states."""
+        if isinstance(texts, str):
+            texts = (texts,)
+        if not self.enabled:
+            self.observer.register(
+                callback, StateFilter(*states or (ANY_STATE,)),
+                F.text.in_(texts)
+            )
+            return
+        handler = HandlerObject(callback=callback)
+        for state in states or (ANY_STATE,):
+            state = getattr(state, 'state', state)
+            for text in texts:
+                self._routes.setdefault((state, text), handler)
+
+    async def __call__(
+            self,
+            handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+            event: Message,
+            data: Dict[str, Any]
+    ) -> Any:
+        data['filter_cache'] = {}
+        if event.text is None:
+            return await handler(event, data)
+        route = (
+            self._routes.get((data.get('raw_state'), event.text))
+            or self._routes.get((ANY_STATE, event.text))
+        )
+        if route is None:
+            return await handler(event, data)
+        return await route.call(event, **data)
+
+
+async def cached_filter(filter_cache, key, compute):
+    """Результат дорогой проверки, общий для всех фильтров одного апдейта."""
+    if filter_cache is None:
+        return await compute()
+    if key not in filter_cache:
+        filter_cache[key] = await compute()
+    return filter_cache[key]
@@ -0,0 +1,39 @@
+import os
+
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from sqlalchemy.engine import make_url
+
+from settings import Scheduler
+
+_job_context = {}
+
+
+def create_scheduler(config: Scheduler) -> AsyncIOScheduler:
+    """Планировщик с хранением заданий в БД.
+
+    Задания переживают перезапуск бота; пропущенные за время простоя
+    выполняются один раз, если опоздали не больше misfire_grace_time.
+    """
+    url = make_url(config.jobstore_url)
+    if url.get_backend_name() == 'sqlite' and url.database:
+        directory = os.path.dirname(url.database)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    return AsyncIOScheduler(
+        timezone=config.timezone,
+        jobstores={'default': SQLAlchemyJobStore(url=config.jobstore_url)},
+        job_defaults={
+            'misfire_grace_time': config.misfire_grace_time,
+            'coalesce': True,
+        }
+    )
+
+
+def register_job_context(**context):
+    """Объекты, которые нельзя сохранить в задании: бот, очередь рассылки."""
+    _job_context.update(context)
+
+
+def job_context():
+    return _job_context
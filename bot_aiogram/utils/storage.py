@@ -0,0 +1,163 @@
+import asyncio
+import json
+import os
+import time
+from functools import partial
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.storage.base import (BaseEventIsolation, BaseStorage,
+                                      StateType, StorageKey)
+from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
+from sqlalchemy import (Column, Float, MetaData, String, Table, Text,
+                        create_engine, delete, insert, select, update)
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import StaticPool
+
+from settings import Storage
+
+# Компактный JSON: без пробелов и \u-экранирования кириллицы.
+compact_dumps = partial(json.dumps, separators=(',', ':'), ensure_ascii=False)
+# Как часто удалять из БД брошенные диалоги, секунды.
+PURGE_INTERVAL = 600
+
+metadata = MetaData()
+fsm_table = Table(
+    'fsm_storage',
+    metadata,
+    Column('key', String(255), primary_key=True),
+    Column('state', String(255), nullable=True),
+    Column('data', Text, nullable=False, default='{}'),
+    Column('expires_at', Float, nullable=True, index=True),
+)
+
+
+def build_key(key: StorageKey):
+    return ':'.join(map(str, (
+        key.bot_id, key.chat_id, key.user_id, key.thread_id or '',
+        key.destiny
+    )))
+
+
+class SqlStorage(BaseStorage):
+    """Хранилище FSM в SQLite или Postgres через SQLAlchemy.
+
+    Запросы выполняются в пуле потоков, чтобы не блокировать цикл
+    событий. Диалоги без изменений дольше ttl секунд считаются брошенными:
+    они не читаются и периодически удаляются.
+    """
+
+    def __init__(self, url: str, ttl: Optional[float] = None):
+        url = make_url(url)
+        options = {}
+        if url.get_backend_name() == 'sqlite':
+            if url.database and url.database != ':memory:':
+                directory = os.path.dirname(url.database)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+            else:
+                # БД в памяти живёт в одном соединении, а запросы идут
+                # из разных потоков.
+                options = {
+                    'poolclass': StaticPool,
+                    'connect_args': {'check_same_thread': False},
+                }
+        self.engine = create_engine(url, **options)
+        self.ttl = ttl
+        self._purged_at = 0.0
+        metadata.create_all(self.engine)
+
+    async def set_state(self, key: StorageKey, state: StateType = None):
+        state = state.state if hasattr(state, 'state') else state
+        await asyncio.to_thread(self._write, build_key(key), state=state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        row = await asyncio.to_thread(self._read, build_key(key))
+        return row.state if row is not None else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]):
+        await asyncio.to_thread(
+            self._write, build_key(key), data=compact_dumps(data)
+        )
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        row = await asyncio.to_thread(self._read, build_key(key))
+        return json.loads(row.data) if row is not None else {}
+
+    async def close(self):
+        await asyncio.to_thread(self.engine.dispose)
+
+    def _expires_at(self):
+        return time.time() + self.ttl if self.ttl else None
+
+    def _read(self, key):
+        with self.engine.connect() as connection:
+            row = connection.execute(
+                select(fsm_table.c.state, fsm_table.c.data)
+                .where(fsm_table.c.key == key)
+                .where(
+                    (fsm_table.c.expires_at.is_(None))
+                    | (fsm_table.c.expires_at > time.time())
+                )
+            ).first()
+        return row
+
+    def _write(self, key, **values):
+        values['expires_at'] = self._expires_at()
+        with self.engine.begin() as connection:
+            # Брошенный диалог начинается заново: иначе запись только
+            # состояния продлила бы срок и вернула прежние данные.
+            connection.execute(
+                delete(fsm_table).where(fsm_table.c.key == key)
+                .where(fsm_table.c.expires_at < time.time())
+            )
+            updated = connection.execute(
+                update(fsm_table).where(fsm_table.c.key == key)
+                .values(**values)
+            ).rowcount
+            if not updated:
+                try:
+                    with connection.begin_nested():
+                        connection.execute(
+                            insert(fsm_table).values(key=key, **values)
+                        )
+                except IntegrityError:
+                    connection.execute(
+                        update(fsm_table).where(fsm_table.c.key == key)
+                        .values(**values)
+                    )
+            if time.monotonic() - self._purged_at > PURGE_INTERVAL:
+                self._purged_at = time.monotonic()
+                connection.execute(
+                    delete(fsm_table)
+                    .where(fsm_table.c.expires_at < time.time())
+                )
+
+
+def create_storage(config: Storage) -> BaseStorage:
+    """Хранилище FSM по настройке FSM_STORAGE: memory, redis или sql."""
+    if config.backend == 'memory':
+        return MemoryStorage()
+    if config.backend == 'redis':
+        from aiogram.fsm.storage.redis import RedisStorage
+        return RedisStorage.from_url(
+            config.url,
+            state_ttl=config.ttl,
+            data_ttl=config.ttl,
+            json_dumps=compact_dumps,
+        )
+    if config.backend == 'sql':
+        return SqlStorage(config.url, ttl=config.ttl)
+    raise ValueError(f'Неизвестное хранилище FSM: {config.backend}')
+
+
+def create_isolation(storage: BaseStorage) -> BaseEventIsolation:
+    """Блокировка обработки событий одного пользователя.
+
+    С Redis блокировка общая для всех реплик бота; для остальных
+    хранилищ — в пределах процесса. Блокировка нужна и MemoryStorage:
+    FsmDataMiddleware записывает данные, прочитанные в начале обновления.
+    """
+    if hasattr(storage, 'create_isolation'):
+        return storage.create_isolation()
+    return SimpleEventIsolation()
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import aiohttp
+
+from settings import Sunset
+from utils import solar
+
+TIME_FORMAT = '%I:%M:%S %p'
+# Сколько секунд не обращаться к API после ошибки.
+RETRY_AFTER = 60
+
+
+class SunsetService:
+    """Время заката для координат кафе.
+
+    По умолчанию считается локально по алгоритму NOAA. Если задан url
+    внешнего API, его ответы кэшируются по (координаты, дата, часовой
+    пояс) в JSON-файле и переживают перезапуск бота, а локальный расчёт
+    остаётся запасным. Оба способа возвращают время в часовом поясе
+    кафе (по умолчанию SUNSET_TIMEZONE).
+    """
+
+    def __init__(self, config: Sunset):
+        self.config = config
+        self.tz = ZoneInfo(config.timezone)
+        self.session = None
+        self._cache = {}
+        self._pending = {}
+        self._save_lock = asyncio.Lock()
+        self._unavailable_until = 0.0
+
+    async def start(self):
+        self.session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.config.timeout)
+        )
+        self._cache = await asyncio.to_thread(self._load)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def sunset(self, day, latitude=None, longitude=None, timezone=None):
+        """Время заката в выбранный день (date или строка ДД.ММ.ГГГГ).
+
+        Возвращает datetime с часовым поясом кафе timezone.
+        """
+        if isinstance(day, str):
+            day = datetime.strptime(day, '%d.%m.%Y').date()
+        if latitude is None or longitude is None:
+            latitude, longitude = self.config.latitude, self.config.longitude
+        tz = ZoneInfo(timezone) if timezone else self.tz
+        key = self._key(latitude, longitude, day, tz)
+        if (self.config.url and key not in self._cache
+                and time.monotonic() >= self._unavailable_until):
+            # Параллельные запросы одного дня ждут один ответ API.
+            if key not in self._pending:
+                self._pending[key] = asyncio.ensure_future(
+                    self._fetch_day(latitude, longitude, day, tz)
+                )
+            try:
+                await asyncio.shield(self._pending[key])
+            finally:
+                self._pending.pop(key, None)
+        if key in self._cache:
+            sunset_time = datetime.strptime(self._cache[key], TIME_FORMAT)
+            return datetime.combine(day, sunset_time.time(), tzinfo=tz)
+        return solar.sunset(latitude, longitude, day).astimezone(tz)
+
+    async def prefetch(self, start: date, end: date):
+        """Загрузить календарь закатов за период одним запросом."""
+        latitude, longitude = self.config.latitude, self.config.longitude
+        days = [
+            start + timedelta(days=offset)
+            for offset in range((end - start).days + 1)
+        ]
+        if all(self._key(latitude, longitude, day, self.tz) in self._cache
+               for day in days):
+            return
+        data = await self._get_json({
+            'lat': latitude, 'lng': longitude,
+            'date_start': start.isoformat(), 'date_end': end.isoformat(),
+            'timezone': self.tz.key
+        })
+        for result in data['results']:
+            key = self._key(latitude, longitude, result['date'], self.tz)
+            self._cache[key] = result['sunset']
+        await self._save()
+
+    async def prefetch_ramadan(self):
+        start, end = self.config.ramadan_start, self.config.ramadan_end
+        if not self.config.url or start is None or end is None:
+            return
+        try:
+            await self.prefetch(start, end)
+        except Exception:
+            logging.exception('Не удалось загрузить календарь закатов')
+
+    async def _fetch_day(self, latitude, longitude, day, tz):
+        try:
+            data = await self._get_json({
+                'lat': latitude, 'lng': longitude, 'date': day.isoformat(),
+                'timezone': tz.key
+            })
+            sunset_time = data['results']['sunset']
+            datetime.strptime(sunset_time, TIME_FORMAT)
+        except Exception:
+            logging.warning(
+                'API заката недоступен, считаем локально', exc_info=True
+            )
+            self._unavailable_until = time.monotonic() + RETRY_AFTER
+            return
+        self._cache[self._key(latitude, longitude, day, tz)] = sunset_time
+        await self._save()
+
+    async def _get_json(self, params):
+        async with self.session.get(self.config.url, params=params) as resp:
+            resp.raise_for_status()
+            return await resp.json()
+
+    @staticmethod
+    def _key(latitude, longitude, day, tz):
+        if isinstance(day, date):
+            day = day.isoformat()
+        return f'{latitude:.5f},{longitude:.5f},{day},{tz.key}'
+
+    def _load(self):
+        try:
+            with open(self.config.cache_path, encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            logging.exception('Не удалось прочитать кэш закатов')
+            return {}
+
+    async def _save(self):
+        async with self._save_lock:
+            await asyncio.to_thread(self._dump, dict(self._cache))
+
+    def _dump(self, cache):
+        directory = os.path.dirname(self.config.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.config.cache_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(cache, file)
+            os.replace(temp_path, self.config.cache_path)
+        except OSError:
+            logging.exception('Не удалось сохранить кэш закатов')
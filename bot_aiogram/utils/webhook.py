@@ -0,0 +1,97 @@
+import asyncio
+import hmac
+import logging
+import signal
+
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+
+from settings import Webhook
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebhookRunner:
+    """Приём обновлений Telegram через вебхук на aiohttp.
+
+    Обновление подтверждается сразу, а обрабатывается в фоне; одновременно
+    обрабатывается не больше max_concurrency обновлений, остальные
+    запросы ждут свободного места, и Telegram сам замедляет отправку.
+    При остановке новые запросы не принимаются, а начатые обновления
+    дорабатываются не дольше drain_timeout секунд.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, config: Webhook):
+        self.dp = dp
+        self.bot = bot
+        self.config = config
+        self._semaphore = asyncio.Semaphore(config.max_concurrency)
+        self._tasks = set()
+        self._closing = False
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post(self.config.path, self.handle)
+        app.on_shutdown.append(self._drain)
+        return app
+
+    async def handle(self, request: web.Request):
+        if not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, ''), self.config.secret
+        ):
+            return web.Response(status=401)
+        if self._closing:
+            return web.Response(status=503)
+        update = await request.json()
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response()
+
+    async def _process(self, update):
+        try:
+            await self.dp.feed_raw_update(self.bot, update)
+        except Exception:
+            logging.exception('Ошибка обработки обновления')
+        finally:
+            self._semaphore.release()
+
+    async def _drain(self, app=None):
+        self._closing = True
+        if not self._tasks:
+            return
+        logging.info('Дорабатываем обновлений: %s', len(self._tasks))
+        done, pending = await asyncio.wait(
+            self._tasks, timeout=self.config.drain_timeout
+        )
+        for task in pending:
+            task.cancel()
+        if pending:
+            logging.warning('Прервано обновлений: %s', len(pending))
+
+    async def run(self, **workflow_data):
+        """Регистрирует вебхук и обслуживает запросы до SIGTERM/SIGINT."""
+        if not self.config.url or not self.config.secret:
+            raise ValueError('Для вебхука нужны WEBHOOK_URL и WEBHOOK_SECRET')
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signal_number, stop.set)
+
+        runner = web.AppRunner(self.app())
+        await runner.setup()
+        await web.TCPSite(runner, self.config.host, self.config.port).start()
+        await self.dp.emit_startup(bot=self.bot, **workflow_data)
+        await self.bot.set_webhook(
+            url=self.config.url + self.config.path,
+            secret_token=self.config.secret,
+            allowed_updates=self.dp.resolve_used_update_types(),
+            max_connections=self.config.max_concurrency,
+        )
+        logging.info('Вебхук слушает порт %s', self.config.port)
+        try:
+            await stop.wait()
+        finally:
+            await runner.cleanup()
+            await self.dp.emit_shutdown(bot=self.bot, **workflow_data)
@@ -53,6 +53,20 @@ MAX_CHAR_LENGTH = 256
 MAX_DIGIT_LENGTH = 15
 MAX_DECIMAL_LENGTH = 2
 
+CAFE_DEFAULT_LATITUDE = 55.78874
+CAFE_DEFAULT_LONGITUDE = 49.12214
+CAFE_DEFAULT_TIMEZONE = 'Europe/Moscow'
+
+TABLE_ALLOCATOR = os.getenv(
+    'TABLE_ALLOCATOR', default='reservation.allocation.SubsetSumAllocator')
+TABLE_ALLOCATOR_OPTIONS = {
+    'max_tables': int(os.getenv('TABLE_ALLOCATOR_MAX_TABLES', default=4)),
+}
+# Сколько секунд столы удерживаются за клиентом до оплаты.
+RESERVATION_HOLD_TTL = int(os.getenv('RESERVATION_HOLD_TTL', default=900))
+# Сколько секунд хранится ответ на запрос с ключом идемпотентности.
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', default=86400))
+
 AUTH_USER_MODEL = 'admin_users.CustomUser'
 
 INSTALLED_APPS = [
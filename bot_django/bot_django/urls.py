@@ -11,6 +11,7 @@ urlpatterns = [
     path('cafes/', include('cafe.urls')),
     path('cafes/<int:cafe_id>/tables/', include('tables.urls')),
     path('cafes/<int:cafe_id>/reservations/', include('reservation.urls')),
+    path('outbox/', include('reservation.outbox_urls')),
     path(
         'redoc/',
         TemplateView.as_view(template_name='redoc.html'),
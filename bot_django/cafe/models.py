@@ -1,7 +1,14 @@
+from zoneinfo import available_timezones
+
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.db.models import UniqueConstraint
 
-from bot_django.settings import MAX_CHAR_LENGTH
+from bot_django.settings import (CAFE_DEFAULT_LATITUDE,
+                                 CAFE_DEFAULT_LONGITUDE,
+                                 CAFE_DEFAULT_TIMEZONE, MAX_CHAR_LENGTH)
+
+TIMEZONE_CHOICES = [(name, name) for name in sorted(available_timezones())]
 
 
 class Cafe(models.Model):
@@ -19,6 +26,22 @@ class Cafe(models.Model):
         'Номер кафе',
         max_length=MAX_CHAR_LENGTH
     )
+    latitude = models.FloatField(
+        'Широта',
+        default=CAFE_DEFAULT_LATITUDE,
+        validators=(MinValueValidator(-90), MaxValueValidator(90))
+    )
+    longitude = models.FloatField(
+        'Долгота',
+        default=CAFE_DEFAULT_LONGITUDE,
+        validators=(MinValueValidator(-180), MaxValueValidator(180))
+    )
+    timezone = models.CharField(
+        'Часовой пояс',
+        max_length=MAX_CHAR_LENGTH,
+        choices=TIMEZONE_CHOICES,
+        default=CAFE_DEFAULT_TIMEZONE
+    )
 
     class Meta:
         verbose_name = 'Кафе'
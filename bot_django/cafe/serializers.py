@@ -8,3 +8,11 @@ class CafeSerializer(serializers.ModelSerializer):
     class Meta:
         fields = '__all__'
         model = Cafe
+
+
+class QuantitySerializer(serializers.Serializer):
+    date = serializers.DateField()
+    quantity = serializers.IntegerField(required=False)
+    cafes = serializers.ListField(
+        child=serializers.IntegerField(), required=False
+    )
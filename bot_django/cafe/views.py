@@ -1,13 +1,12 @@
+from django.http import Http404, JsonResponse
 from rest_framework import viewsets
 from rest_framework.decorators import action
-from django.http import JsonResponse
-from datetime import date
 
 from cafe.models import Cafe
-from tables.models import Table
-from reservation.models import Reservation
-from cafe.serializers import CafeSerializer
+from cafe.serializers import CafeSerializer, QuantitySerializer
 from admin_users.models import CustomUser
+from reservation.availability import (AVAILABILITY_FIELDS, get_availabilities,
+                                      get_availability)
 
 
 class CafeViewSet(viewsets.ReadOnlyModelViewSet):
@@ -16,30 +15,32 @@ class CafeViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(methods=['POST'], detail=True)
     def quantity(self, request, pk):
-        data = request.data
-        if 'quantity' not in data.keys():
-            return JsonResponse({
-                'date': [
-                    'Обязательное поле.'
-                ]
-            })
-        cafe = Cafe.objects.get(id=pk)
-        res_date = date.fromisoformat(data['date'])
-        available_tables = Table.objects.filter(
-            cafe=cafe).exclude(
-            id__in=Reservation.table.through.objects.filter(
-                reservation__cafe__id=cafe.id,
-                reservation__date=res_date,
-                reservation__status='booked'
-            ).values('table')
+        serializer = QuantitySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        res_date = serializer.validated_data['date']
+        availability = get_availability(int(pk), res_date)
+        if availability is None:
+            raise Http404
+        return JsonResponse({
+            'cafe': availability.cafe.address,
+            'date': res_date,
+            **{
+                field: getattr(availability, field)
+                for field in AVAILABILITY_FIELDS
+            }
+        })
+
+    @action(methods=['POST'], detail=False)
+    def quantities(self, request):
+        serializer = QuantitySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        res_date = serializer.validated_data['date']
+        cafes = get_availabilities(
+            res_date, serializer.validated_data.get('cafes')
         )
-        quantity = 0
-        for table in available_tables:
-            quantity += table.quantity
         return JsonResponse({
-            'cafe': cafe.address,
             'date': res_date,
-            'quantity': quantity
+            'cafes': cafes
         })
 
     @action(methods=['GET'], detail=True)
@@ -5,7 +5,7 @@ from django.utils.html import format_html
 from django.utils.http import urlencode
 
 from cafe.models import Cafe
-from reservation.models import OrderSets, Reservation
+from reservation.models import OrderSets, OutboxEvent, Reservation
 from reservation.validation import (tables_available, tables_in_cafe,
                                     tables_in_cafe_in_date)
 from tables.models import Table
@@ -127,3 +127,10 @@ class OrderSetsAdmin(admin.ModelAdmin):
                 reservation__cafe__id=request.user.cafe.id
             )
         return queryset
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'reservation', 'created_at', 'processed_at')
+    list_filter = ('kind',)
+    readonly_fields = ('reservation', 'kind', 'payload', 'created_at')
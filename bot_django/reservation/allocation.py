@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class TableAllocator:
+    """
+    Подбор столов под бронь.
+    На вход - свободные столы кафе в виде словарей с ключами
+    id, quantity и table_type; на выход - список id или None.
+    Параметры из TABLE_ALLOCATOR_OPTIONS, которые распределитель
+    не использует, игнорируются.
+    """
+
+    def __init__(self, **options):
+        pass
+
+    def allocate(self, tables, quantity):
+        raise NotImplementedError
+
+    @staticmethod
+    def free_bar_table(tables, quantity):
+        """Одиночному гостю в первую очередь отдаём барное место."""
+        if quantity != 1:
+            return None
+        for table in tables:
+            if table['table_type'] == 'bar_table':
+                return [table['id']]
+        return None
+
+    @staticmethod
+    def merge_largest(tables, quantity):
+        """Сдвигаем самые большие столы, пока хватает мест."""
+        merged_tables = []
+        total_quantity = 0
+        for table in reversed(sorted(
+            tables, key=lambda table: table['quantity']
+        )):
+            merged_tables.append(table['id'])
+            total_quantity += table['quantity']
+            if total_quantity >= quantity:
+                return merged_tables
+        return None
+
+
+class GreedyAllocator(TableAllocator):
+    """Наименьший подходящий стол, иначе сдвигаем самые большие столы."""
+
+    def allocate(self, tables, quantity):
+        bar_table = self.free_bar_table(tables, quantity)
+        if bar_table:
+            return bar_table
+        simple_tables = sorted(
+            (table for table in tables
+             if table['table_type'] == 'simple_table'),
+            key=lambda table: table['quantity']
+        )
+        for table in simple_tables:
+            if table['quantity'] >= quantity:
+                return [table['id']]
+        return self.merge_largest(simple_tables, quantity)
+
+
+class SubsetSumAllocator(TableAllocator):
+    """
+    Набор столов с наименьшим числом пустых мест, а при равенстве -
+    с наименьшим числом сдвигаемых столов (не больше max_tables).
+    Сначала ищем среди обычных столов, затем добавляем барные.
+    Если в max_tables столов гости не помещаются, сдвигаем самые
+    большие столы без ограничения, как GreedyAllocator: иначе бронь,
+    на которую /quantity/ показывает достаточно мест, не пройдёт.
+    """
+
+    def __init__(self, max_tables=4, **options):
+        super().__init__(**options)
+        self.max_tables = max_tables
+
+    def allocate(self, tables, quantity):
+        bar_table = self.free_bar_table(tables, quantity)
+        if bar_table:
+            return bar_table
+        simple_tables = [
+            table for table in tables
+            if table['table_type'] == 'simple_table'
+        ]
+        return (
+            self.best_subset(simple_tables, quantity)
+            or self.best_subset(tables, quantity)
+            or self.merge_largest(simple_tables, quantity)
+            or self.merge_largest(tables, quantity)
+        )
+
+    def best_subset(self, tables, quantity):
+        if not tables:
+            return None
+        limit = quantity + max(table['quantity'] for table in tables)
+        best = {0: []}
+        for table in tables:
+            for seats, chosen in list(best.items()):
+                new_seats = seats + table['quantity']
+                if new_seats > limit or len(chosen) >= self.max_tables:
+                    continue
+                current = best.get(new_seats)
+                if current is None or len(chosen) + 1 < len(current):
+                    best[new_seats] = chosen + [table['id']]
+        fitting = [seats for seats in best if seats >= quantity]
+        if not fitting:
+            return None
+        return best[min(fitting)]
+
+
+def get_allocator():
+    """Распределитель столов из настройки TABLE_ALLOCATOR."""
+    allocator_class = import_string(settings.TABLE_ALLOCATOR)
+    return allocator_class(**settings.TABLE_ALLOCATOR_OPTIONS)
@@ -0,0 +1,166 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+from django.db.models.functions import Coalesce
+
+from cafe.models import Cafe
+from reservation.models import ACTIVE_STATUSES, Availability, Reservation
+from tables.models import Table
+
+AVAILABILITY_FIELDS = (
+    'quantity', 'simple_quantity', 'bar_quantity', 'max_table'
+)
+
+
+def booked_tables(res_date, cafe_ids=None):
+    """Подзапрос id столов, занятых бронями и удержаниями на дату."""
+    booked = Reservation.table.through.objects.filter(
+        reservation__date=res_date,
+        reservation__status__in=ACTIVE_STATUSES
+    )
+    if cafe_ids is not None:
+        booked = booked.filter(reservation__cafe__id__in=cafe_ids)
+    return booked.values('table')
+
+
+def free_places_by_cafe(res_date, cafe_ids=None):
+    """
+    Свободные места во всех (или указанных) кафе одним запросом:
+    всего, за обычными и барными столами, и самый большой свободный стол.
+    """
+    cafes = Cafe.objects.all()
+    if cafe_ids is not None:
+        cafes = cafes.filter(id__in=cafe_ids)
+    free = ~Q(tables__id__in=booked_tables(res_date, cafe_ids))
+    simple = free & Q(tables__table_type='simple_table')
+    bar = free & Q(tables__table_type='bar_table')
+    return cafes.annotate(
+        quantity=Coalesce(Sum('tables__quantity', filter=free), 0),
+        simple_quantity=Coalesce(Sum('tables__quantity', filter=simple), 0),
+        bar_quantity=Coalesce(Sum('tables__quantity', filter=bar), 0),
+        max_table=Coalesce(Max('tables__quantity', filter=simple), 0),
+    ).values(
+        'id', 'address', *AVAILABILITY_FIELDS
+    )
+
+
+def build_availability(res_date, cafe_ids):
+    """Рассчитать (без сохранения) свободные места кафе на дату."""
+    free_tables = defaultdict(list)
+    tables = Table.objects.filter(cafe__id__in=cafe_ids).exclude(
+        id__in=booked_tables(res_date, cafe_ids)
+    ).order_by('id').values_list('cafe_id', 'id')
+    for cafe_id, table_id in tables:
+        free_tables[cafe_id].append(table_id)
+    return [
+        Availability(
+            cafe_id=places['id'],
+            date=res_date,
+            free_tables=free_tables[places['id']],
+            **{field: places[field] for field in AVAILABILITY_FIELDS}
+        )
+        for places in free_places_by_cafe(res_date, cafe_ids)
+    ]
+
+
+def locked_availabilities(res_date, cafe_ids):
+    """Записи о местах кафе на дату, заблокированные до конца транзакции."""
+    return {
+        row.cafe_id: row
+        for row in Availability.objects.select_for_update().filter(
+            cafe_id__in=cafe_ids, date=res_date
+        ).order_by('cafe_id')
+    }
+
+
+def rebuild_availabilities(res_date, cafe_ids):
+    """Пересчитать записи о местах кафе на дату под их блокировкой.
+
+    Недостающие записи вставляются пустыми и тоже блокируются, и только
+    после этого записи рассчитываются: снимок, посчитанный до брони,
+    созданной параллельно, не попадёт в таблицу. Вызывается в транзакции;
+    возвращает записи существующих кафе по id кафе.
+    """
+    rows = locked_availabilities(res_date, cafe_ids)
+    missing = [cafe_id for cafe_id in cafe_ids if cafe_id not in rows]
+    if missing:
+        Availability.objects.bulk_create(
+            [
+                Availability(cafe_id=cafe_id, date=res_date)
+                for cafe_id in Cafe.objects.filter(
+                    id__in=missing
+                ).values_list('id', flat=True)
+            ],
+            ignore_conflicts=True
+        )
+        rows.update(locked_availabilities(res_date, missing))
+    for built in build_availability(res_date, list(rows)):
+        row = rows[built.cafe_id]
+        row.free_tables = built.free_tables
+        for field in AVAILABILITY_FIELDS:
+            setattr(row, field, getattr(built, field))
+    Availability.objects.bulk_update(
+        rows.values(), ('free_tables', *AVAILABILITY_FIELDS)
+    )
+    return rows
+
+
+def refresh_availability(cafe_id, res_date):
+    """Пересчитать запись о свободных местах кафе на дату."""
+    with transaction.atomic():
+        return rebuild_availabilities(res_date, [cafe_id]).get(cafe_id)
+
+
+def lock_availability(cafe_id, res_date):
+    """
+    Блокирует запись о местах кафе на дату до конца транзакции.
+    Все изменения броней кафе на дату выстраиваются в очередь на ней.
+    """
+    availability = Availability.objects.select_for_update().filter(
+        cafe_id=cafe_id, date=res_date
+    ).first()
+    if availability is None:
+        availability = rebuild_availabilities(res_date, [cafe_id]).get(cafe_id)
+    if availability is None:
+        raise Availability.DoesNotExist
+    return availability
+
+
+def get_availability(cafe_id, res_date):
+    """Свободные места кафе на дату, при отсутствии записи - с расчётом."""
+    try:
+        return Availability.objects.select_related('cafe').get(
+            cafe_id=cafe_id, date=res_date
+        )
+    except Availability.DoesNotExist:
+        return refresh_availability(cafe_id, res_date)
+
+
+def get_availabilities(res_date, cafe_ids=None):
+    """
+    Свободные места всех (или указанных) кафе на дату.
+    Недостающие записи рассчитываются пачкой под блокировкой.
+    """
+    cafes = Cafe.objects.all()
+    ledger = Availability.objects.filter(date=res_date)
+    if cafe_ids is not None:
+        cafes = cafes.filter(id__in=cafe_ids)
+        ledger = ledger.filter(cafe_id__in=cafe_ids)
+    cafes = list(cafes.values('id', 'address'))
+    rows = {row.cafe_id: row for row in ledger}
+    missing = [cafe['id'] for cafe in cafes if cafe['id'] not in rows]
+    if missing:
+        with transaction.atomic():
+            rows.update(rebuild_availabilities(res_date, missing))
+    return [
+        {
+            'id': cafe['id'],
+            'address': cafe['address'],
+            **{
+                field: getattr(rows[cafe['id']], field)
+                for field in AVAILABILITY_FIELDS
+            }
+        }
+        for cafe in cafes
+    ]
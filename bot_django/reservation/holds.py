@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from bot_django.settings import RESERVATION_HOLD_TTL
+from reservation.availability import lock_availability, refresh_availability
+from reservation.models import OutboxEvent, Reservation
+
+
+def hold_expires_at():
+    """Срок удержания столов, созданного сейчас."""
+    return timezone.now() + timedelta(seconds=RESERVATION_HOLD_TTL)
+
+
+def cancel_holds(ids):
+    """Отменить удержания и их ещё не выданные боту события.
+
+    Записи о свободных местах не пересчитываются: это делает вызывающий
+    код под блокировкой lock_availability.
+    """
+    cancelled = Reservation.objects.filter(
+        id__in=ids, status='held'
+    ).update(status='cancelled', hold_expires_at=None)
+    OutboxEvent.objects.filter(
+        reservation_id__in=ids, processed_at__isnull=True
+    ).delete()
+    return cancelled
+
+
+def release_expired(cafe_id, res_date):
+    """Отменить просроченные удержания кафе на дату.
+
+    Вызывается под блокировкой записи о местах кафе на дату; если что-то
+    отменено, запись пересчитывается и функция возвращает True.
+    """
+    expired = list(Reservation.objects.filter(
+        cafe_id=cafe_id, date=res_date, status='held',
+        hold_expires_at__lte=timezone.now()
+    ).values_list('id', flat=True))
+    if not expired:
+        return False
+    cancel_holds(expired)
+    refresh_availability(cafe_id, res_date)
+    return True
+
+
+def expire_holds():
+    """Отменить все просроченные удержания.
+
+    Просроченные удержания находятся по частичному индексу, каждая пара
+    кафе и даты обрабатывается в своей транзакции под блокировкой записи
+    о местах. Возвращает количество затронутых пар.
+    """
+    slots = Reservation.objects.filter(
+        status='held', hold_expires_at__lte=timezone.now()
+    ).values_list('cafe_id', 'date').distinct()
+    released = 0
+    for cafe_id, res_date in slots:
+        with transaction.atomic():
+            lock_availability(cafe_id, res_date)
+            released += release_expired(cafe_id, res_date)
+    return released
+
+
+def confirm_hold(cafe_id, reservation_id):
+    """Подтвердить удержание одним UPDATE по первичному ключу.
+
+    Столы уже учтены как занятые, поэтому пересчёт мест не нужен.
+    Возвращает False, если удержания нет или оно истекло.
+    """
+    return bool(Reservation.objects.filter(
+        pk=reservation_id, cafe_id=cafe_id, status='held',
+        hold_expires_at__gt=timezone.now()
+    ).update(status='booked', hold_expires_at=None))
+
+
+def release_hold(cafe_id, reservation_id):
+    """Освободить столы удержания до истечения срока."""
+    res_date = Reservation.objects.filter(
+        pk=reservation_id, cafe_id=cafe_id, status='held'
+    ).values_list('date', flat=True).first()
+    if res_date is None:
+        return False
+    with transaction.atomic():
+        lock_availability(cafe_id, res_date)
+        if not cancel_holds([reservation_id]):
+            return False
+        refresh_availability(cafe_id, res_date)
+    return True
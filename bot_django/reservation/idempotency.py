@@ -0,0 +1,76 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from bot_django.settings import IDEMPOTENCY_KEY_TTL
+from reservation.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+
+def request_fingerprint(data):
+    """Хеш тела запроса, чтобы ключ не применялся к другому запросу."""
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def idempotent(request, handler):
+    """Выполнить handler один раз на ключ из заголовка Idempotency-Key.
+
+    Ключ действует в пределах пути запроса и записывается в той же
+    транзакции, что и результат handler, поэтому повтор с тем же ключом
+    возвращает сохранённый ответ, а одновременный повтор ждёт первую
+    транзакцию на уникальном индексе.
+    Если handler завершился ошибкой, ключ не сохраняется и запрос
+    можно повторить. Без заголовка handler просто выполняется.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        return handler()
+    fingerprint = request_fingerprint(request.data)
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    path=request.path, key=key, fingerprint=fingerprint
+                )
+        except IntegrityError:
+            return replay(request.path, key, fingerprint)
+        response = handler()
+        record.status_code = response.status_code
+        record.response = response.data
+        record.save(update_fields=('status_code', 'response'))
+    return response
+
+
+def replay(path, key, fingerprint):
+    """Ответ на повтор запроса с уже использованным ключом."""
+    record = IdempotencyKey.objects.get(path=path, key=key)
+    if record.fingerprint != fingerprint:
+        return Response(
+            {
+                'status': 'error',
+                'message': 'Ключ идемпотентности уже использован '
+                           'для другого запроса.'
+            },
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(
+        record.response,
+        status=record.status_code,
+        headers={'Idempotent-Replayed': 'true'}
+    )
+
+
+def expire_keys():
+    """Удалить ключи старше IDEMPOTENCY_KEY_TTL одним запросом."""
+    deleted, _ = IdempotencyKey.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=IDEMPOTENCY_KEY_TTL)
+    ).delete()
+    return deleted
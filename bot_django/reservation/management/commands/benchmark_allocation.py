@@ -0,0 +1,103 @@
+import random
+from statistics import mean
+from time import perf_counter
+
+from django.core.management import BaseCommand
+from django.utils.module_loading import import_string
+
+from tables.models import Table
+
+DEFAULT_LAYOUT = [10, 6, 6, 4, 4, 4, 3, 3, 2, 2, 2, 2]
+DEFAULT_BAR_SEATS = 6
+PARTY_SIZES = [1, 2, 2, 2, 3, 3, 4, 4, 4, 5, 6, 7, 8, 10, 12]
+ALLOCATORS = (
+    'reservation.allocation.GreedyAllocator',
+    'reservation.allocation.SubsetSumAllocator',
+)
+
+
+class Command(BaseCommand):
+    """Прогон потока броней за день через распределители столов"""
+    help = (
+        "Replays a day's booking stream against table allocators and "
+        "reports seat utilization and allocation latency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cafe', type=int,
+            help='Take the table layout of this cafe from the database'
+        )
+        parser.add_argument('--bookings', type=int, default=60)
+        parser.add_argument('--days', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--allocator', action='append',
+            help='Dotted path of an allocator class, may be repeated'
+        )
+
+    def handle(self, *args, **options):
+        tables = self.get_layout(options['cafe'])
+        capacity = sum(table['quantity'] for table in tables)
+        self.stdout.write(
+            f'{len(tables)} tables, {capacity} seats, '
+            f'{options["bookings"]} requests x {options["days"]} days'
+        )
+        rng = random.Random(options['seed'])
+        streams = [
+            [rng.choice(PARTY_SIZES) for _ in range(options['bookings'])]
+            for _ in range(options['days'])
+        ]
+        for path in options['allocator'] or ALLOCATORS:
+            self.replay(import_string(path)(), tables, streams, capacity)
+
+    def get_layout(self, cafe_id):
+        if cafe_id:
+            return list(
+                Table.objects.filter(cafe__id=cafe_id).values(
+                    'id', 'quantity', 'table_type'
+                )
+            )
+        layout = [
+            {'id': number, 'quantity': quantity,
+             'table_type': 'simple_table'}
+            for number, quantity in enumerate(DEFAULT_LAYOUT)
+        ]
+        layout += [
+            {'id': len(layout) + number, 'quantity': 1,
+             'table_type': 'bar_table'}
+            for number in range(DEFAULT_BAR_SEATS)
+        ]
+        return layout
+
+    def replay(self, allocator, tables, streams, capacity):
+        seated = occupied = rejected = merged = 0
+        timings = []
+        for stream in streams:
+            free = list(tables)
+            for quantity in stream:
+                started = perf_counter()
+                chosen = allocator.allocate(free, quantity)
+                timings.append(perf_counter() - started)
+                if not chosen:
+                    rejected += 1
+                    continue
+                chosen = set(chosen)
+                seated += quantity
+                occupied += sum(
+                    table['quantity'] for table in free
+                    if table['id'] in chosen
+                )
+                merged += len(chosen) > 1
+                free = [table for table in free if table['id'] not in chosen]
+        timings.sort()
+        days = len(streams)
+        self.stdout.write(
+            f'{type(allocator).__name__}: '
+            f'covers/day {seated / days:.1f}, '
+            f'fill {seated / (capacity * days):.1%}, '
+            f'seat utilization {seated / max(occupied, 1):.1%}, '
+            f'rejected {rejected}, merged {merged}, '
+            f'latency mean {mean(timings) * 1e6:.1f} us, '
+            f'p99 {timings[int(len(timings) * 0.99)] * 1e6:.1f} us'
+        )
@@ -0,0 +1,165 @@
+import random
+from datetime import date, timedelta
+from time import perf_counter
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+
+from cafe.models import Cafe
+from reservation.availability import (booked_tables, build_availability,
+                                      free_places_by_cafe)
+from reservation.models import Reservation
+from tables.models import Table
+
+TABLE_SIZES = (1, 2, 2, 3, 4, 4, 6, 8, 10)
+# Индексы для запросов свободных мест, эффект которых измеряется.
+BENCHMARKED_INDEXES = (
+    (Reservation, 'reservation_active_date'),
+    (Table, 'table_cafe_type_quantity'),
+)
+
+
+class Command(BaseCommand):
+    """Замер запросов свободных мест на большом объёме броней"""
+    help = (
+        "Seeds cafes, tables and reservations, then prints EXPLAIN plans "
+        "and timings of the availability queries with the availability "
+        "indexes and after dropping them. The data and the dropped indexes "
+        "are rolled back unless --keep is given. Dropping an index locks "
+        "its table until the end, so do not run it against a live database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservations', type=int, default=50000)
+        parser.add_argument('--cafes', type=int, default=10)
+        parser.add_argument('--tables', type=int, default=40)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--keep', action='store_true')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            cafe_ids, res_date = self.seed(options)
+            self.stdout.write(self.style.MIGRATE_LABEL('With indexes'))
+            indexed = self.measure(cafe_ids[0], res_date, options['runs'])
+            self.execute_index_sql('remove_sql')
+            self.stdout.write(self.style.MIGRATE_LABEL('Without indexes'))
+            plain = self.measure(cafe_ids[0], res_date, options['runs'])
+            self.stdout.write(self.style.MIGRATE_LABEL('Effect of indexes'))
+            for name, elapsed in indexed.items():
+                self.stdout.write(
+                    f'{name}: {plain[name] * 1000:.2f} -> '
+                    f'{elapsed * 1000:.2f} ms per run '
+                    f'({plain[name] / elapsed:.1f}x)'
+                )
+            if options['keep']:
+                self.execute_index_sql('create_sql')
+            else:
+                transaction.set_rollback(True)
+
+    def measure(self, cafe_id, res_date, runs):
+        """Планы и время запросов свободных мест, мс по названиям."""
+        queries = {
+            'free places, all cafes': free_places_by_cafe(res_date),
+            'free places, one cafe': free_places_by_cafe(
+                res_date, [cafe_id]
+            ),
+            'booked tables of a cafe': Reservation.table.through.objects
+            .filter(id__in=booked_tables(res_date, [cafe_id])),
+            'tables by cafe, type and size': Table.objects.filter(
+                cafe__id=cafe_id,
+                table_type='simple_table',
+                quantity__gte=4
+            ),
+        }
+        timings = {
+            name: self.report(name, queryset, runs)
+            for name, queryset in queries.items()
+        }
+        timings['ledger row rebuild'] = self.time(
+            'ledger row rebuild',
+            lambda: build_availability(res_date, [cafe_id]),
+            runs
+        )
+        return timings
+
+    def execute_index_sql(self, method):
+        """Удалить (remove_sql) или создать (create_sql) индексы замера."""
+        editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model, name in BENCHMARKED_INDEXES:
+                index = next(
+                    index for index in model._meta.indexes
+                    if index.name == name
+                )
+                cursor.execute(str(getattr(index, method)(model, editor)))
+
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        started = perf_counter()
+        prefix = f'benchmark-{rng.random()}'
+        cafes = Cafe.objects.bulk_create(
+            Cafe(
+                name=f'{prefix}-{number}',
+                address=f'{prefix}-{number}',
+                number='0'
+            )
+            for number in range(options['cafes'])
+        )
+        tables = Table.objects.bulk_create(
+            Table(
+                name=f'{number}',
+                cafe=cafe,
+                quantity=rng.choice(TABLE_SIZES),
+                table_type='simple_table'
+            )
+            for cafe in cafes
+            for number in range(options['tables'])
+        )
+        tables_by_cafe = {}
+        for table in tables:
+            tables_by_cafe.setdefault(table.cafe_id, []).append(table.id)
+        first_day = date.today()
+        reservations = Reservation.objects.bulk_create(
+            Reservation(
+                cafe=rng.choice(cafes),
+                date=first_day + timedelta(
+                    days=rng.randrange(options['days'])
+                ),
+                name='benchmark',
+                number='0',
+                status=rng.choice(('booked', 'booked', 'cancelled'))
+            )
+            for _ in range(options['reservations'])
+        )
+        Reservation.table.through.objects.bulk_create(
+            Reservation.table.through(
+                reservation_id=reservation.id,
+                table_id=rng.choice(tables_by_cafe[reservation.cafe_id])
+            )
+            for reservation in reservations
+        )
+        self.stdout.write(
+            f'seeded {len(cafes)} cafes, {len(tables)} tables, '
+            f'{len(reservations)} reservations '
+            f'in {perf_counter() - started:.1f} s'
+        )
+        busiest = Reservation.objects.filter(cafe__in=cafes).values(
+            'date'
+        ).annotate(Count('id')).order_by('-id__count').first()['date']
+        return [cafe.id for cafe in cafes], busiest
+
+    def report(self, name, queryset, runs):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        self.stdout.write(queryset.explain())
+        return self.time(name, lambda: list(queryset.all()), runs)
+
+    def time(self, name, function, runs):
+        started = perf_counter()
+        for _ in range(runs):
+            function()
+        elapsed = (perf_counter() - started) / runs
+        self.stdout.write(f'{name}: {elapsed * 1000:.2f} ms per run\n')
+        return elapsed
@@ -0,0 +1,59 @@
+from datetime import date, timedelta
+from statistics import median
+from time import perf_counter
+
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from cafe.models import Cafe
+from menu.models import Set
+
+
+class Command(BaseCommand):
+    """Задержка брони на pre_checkout: полное создание против подтверждения"""
+    help = (
+        "Compares the latency of creating a reservation at pre-checkout "
+        "with confirming a hold made earlier. The data is rolled back "
+        "unless --keep is given"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--keep', action='store_true')
+
+    def handle(self, *args, **options):
+        cafe = Cafe.objects.filter(tables__isnull=False).first()
+        menu_set = Set.objects.first()
+        if cafe is None or menu_set is None:
+            raise CommandError('Нужны кафе со столами и хотя бы один сет')
+        client = APIClient()
+        base = f'/cafes/{cafe.id}/reservations/'
+        with transaction.atomic():
+            create, confirm = [], []
+            for number in range(options['requests']):
+                data = {
+                    'quantity': 1,
+                    'sets': [{'sets': menu_set.id, 'quantity': 1}],
+                    'date': (
+                        date.today() + timedelta(days=number + 1)
+                    ).isoformat(),
+                    'name': 'Benchmark',
+                    'number': '0',
+                }
+                moment = perf_counter()
+                client.post(base, data, format='json')
+                create.append(perf_counter() - moment)
+                answer = client.post(f'{base}hold/', data, format='json')
+                if 'id' not in answer.json():
+                    continue
+                moment = perf_counter()
+                client.post(f'{base}{answer.json()["id"]}/confirm/')
+                confirm.append(perf_counter() - moment)
+            self.stdout.write(
+                f'create {median(create) * 1000:.2f} ms, '
+                f'confirm {median(confirm) * 1000:.2f} ms '
+                f'(median of {len(create)} / {len(confirm)})'
+            )
+            if not options['keep']:
+                transaction.set_rollback(True)
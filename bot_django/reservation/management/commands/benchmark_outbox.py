@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+from time import perf_counter
+
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from reservation.models import OutboxEvent, Reservation
+
+
+class Command(BaseCommand):
+    """Пропускная способность выдачи и подтверждения событий для бота"""
+    help = (
+        "Seeds outbox events and drains them through /outbox/claim/ and "
+        "/outbox/ack/ like the bot relay does, printing events per "
+        "minute. The data is rolled back unless --keep is given"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=20000)
+        parser.add_argument('--batch', type=int, default=100)
+        parser.add_argument('--keep', action='store_true')
+
+    def handle(self, *args, **options):
+        reservation = Reservation.objects.select_related('cafe').first()
+        if reservation is None:
+            raise CommandError('Нужна хотя бы одна бронь')
+        client = APIClient()
+        with transaction.atomic():
+            self.seed(reservation, options['events'])
+            claimed = acked = 0
+            claim_time = ack_time = 0.0
+            started = perf_counter()
+            while True:
+                moment = perf_counter()
+                events = client.post(
+                    '/outbox/claim/', {'limit': options['batch']},
+                    format='json'
+                ).json()['events']
+                claim_time += perf_counter() - moment
+                if not events:
+                    break
+                claimed += len(events)
+                moment = perf_counter()
+                acked += client.post(
+                    '/outbox/ack/', {'ids': [event['id'] for event in events]},
+                    format='json'
+                ).json()['processed']
+                ack_time += perf_counter() - moment
+            elapsed = perf_counter() - started
+            batches = -(-claimed // options['batch'])
+            self.stdout.write(
+                f'{claimed} claimed, {acked} acknowledged in {elapsed:.2f} s, '
+                f'{claimed / elapsed * 60:.0f} events/min, '
+                f'claim {claim_time / batches * 1000:.1f} ms, '
+                f'ack {ack_time / batches * 1000:.1f} ms per batch '
+                f'of {options["batch"]}'
+            )
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def seed(self, reservation, count):
+        res_date = date.today() + timedelta(days=1)
+        OutboxEvent.objects.bulk_create(
+            OutboxEvent(
+                reservation=reservation,
+                kind='reservation_created',
+                payload={
+                    'reservation': reservation.id,
+                    'chat_id': number,
+                    'cafe': {
+                        'id': reservation.cafe.id,
+                        'address': reservation.cafe.address,
+                        'number': reservation.cafe.number,
+                        'latitude': reservation.cafe.latitude,
+                        'longitude': reservation.cafe.longitude,
+                        'timezone': reservation.cafe.timezone,
+                    },
+                    'date': res_date.isoformat(),
+                    'name': 'Benchmark',
+                    'number': '0',
+                    'quantity': 2,
+                    'sets': [{'sets': 1, 'quantity': 2}],
+                    'total_price': '800.00',
+                },
+            )
+            for number in range(count)
+        )
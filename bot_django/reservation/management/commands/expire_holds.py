@@ -0,0 +1,29 @@
+from time import sleep
+
+from django.core.management import BaseCommand
+
+from reservation.holds import expire_holds
+
+
+class Command(BaseCommand):
+    """Отмена удержаний столов, не оплаченных вовремя"""
+    help = (
+        "Cancels expired seat holds and frees their tables. With --every "
+        "the sweep repeats every N seconds"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--every',
+            type=int,
+            help='Repeat the sweep every N seconds'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            released = expire_holds()
+            if released:
+                self.stdout.write(f'Released holds in {released} cafe-days')
+            if not options['every']:
+                break
+            sleep(options['every'])
@@ -0,0 +1,29 @@
+from time import sleep
+
+from django.core.management import BaseCommand
+
+from reservation.idempotency import expire_keys
+
+
+class Command(BaseCommand):
+    """Удаление ключей идемпотентности старше IDEMPOTENCY_KEY_TTL"""
+    help = (
+        "Deletes idempotency keys older than IDEMPOTENCY_KEY_TTL. With "
+        "--every the cleanup repeats every N seconds"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--every',
+            type=int,
+            help='Repeat the cleanup every N seconds'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = expire_keys()
+            if deleted:
+                self.stdout.write(f'Deleted {deleted} idempotency keys')
+            if not options['every']:
+                break
+            sleep(options['every'])
@@ -0,0 +1,47 @@
+from datetime import date
+
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from cafe.models import Cafe
+from reservation.availability import rebuild_availabilities
+from reservation.models import Availability, Reservation
+
+
+class Command(BaseCommand):
+    """Пересчёт таблицы свободных мест по текущим броням"""
+    help = "Rebuilds the availability ledger from reservations"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=date.fromisoformat,
+            help='Rebuild only this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild past dates too'
+        )
+
+    def handle(self, *args, **options):
+        reservations = Reservation.objects.all()
+        if options['date']:
+            dates = [options['date']]
+        else:
+            if not options['all']:
+                reservations = reservations.filter(date__gte=date.today())
+            dates = reservations.order_by('date').values_list(
+                'date', flat=True
+            ).distinct()
+        cafe_ids = list(Cafe.objects.values_list('id', flat=True))
+        with transaction.atomic():
+            ledger = Availability.objects.all()
+            if options['date']:
+                ledger = ledger.filter(date=options['date'])
+            elif not options['all']:
+                ledger = ledger.filter(date__gte=date.today())
+            ledger.delete()
+            for res_date in dates:
+                rebuild_availabilities(res_date, cafe_ids)
+                self.stdout.write(f'{res_date}: {len(cafe_ids)} cafes')
@@ -0,0 +1,92 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from time import perf_counter
+
+import requests
+from django.core.management import BaseCommand, CommandError
+from django.db.models import Count
+
+from menu.models import Set
+from reservation.models import ACTIVE_STATUSES, Reservation
+
+
+class Command(BaseCommand):
+    """Параллельные брони одного кафе на одну дату с проверкой пересечений"""
+    help = (
+        "Fires parallel POSTs at /cafes/{id}/reservations/ of a running "
+        "server and checks that no table is booked twice"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--cafe', type=int, required=True)
+        parser.add_argument('--date', type=date.fromisoformat, required=True)
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--quantity', type=int, default=2)
+
+    def handle(self, *args, **options):
+        set_id = Set.objects.values_list('id', flat=True).first()
+        if set_id is None:
+            raise CommandError('Нужен хотя бы один сет, выполните load_data')
+        url = f'{options["url"]}/cafes/{options["cafe"]}/reservations/'
+        payload = {
+            'quantity': options['quantity'],
+            'sets': [{'sets': set_id, 'quantity': 1}],
+            'date': options['date'].isoformat(),
+            'name': 'Stress',
+            'number': '0',
+        }
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_maxsize=options['concurrency']
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        def post(_):
+            started = perf_counter()
+            try:
+                status = session.post(url, json=payload, timeout=60)
+                status = status.status_code
+            except requests.RequestException as error:
+                status = type(error).__name__
+            return status, perf_counter() - started
+
+        started = perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            results = list(executor.map(post, range(options['requests'])))
+        elapsed = perf_counter() - started
+
+        statuses = Counter(status for status, _ in results)
+        timings = sorted(timing for _, timing in results)
+        self.stdout.write(
+            f'{len(results)} requests in {elapsed:.2f} s, '
+            f'{len(results) / elapsed:.1f} req/s, '
+            f'p50 {timings[len(timings) // 2] * 1000:.0f} ms, '
+            f'p99 {timings[int(len(timings) * 0.99)] * 1000:.0f} ms'
+        )
+        self.stdout.write(f'statuses: {dict(statuses)}')
+        self.check_bookings(options['cafe'], options['date'])
+
+    def check_bookings(self, cafe_id, res_date):
+        booked = Reservation.table.through.objects.filter(
+            reservation__cafe__id=cafe_id,
+            reservation__date=res_date,
+            reservation__status__in=ACTIVE_STATUSES
+        )
+        double_booked = booked.values('table').annotate(
+            reservations=Count('reservation')
+        ).filter(reservations__gt=1)
+        orphans = Reservation.objects.filter(
+            cafe__id=cafe_id, date=res_date, table__isnull=True
+        )
+        if double_booked.exists() or orphans.exists():
+            raise CommandError(
+                f'Двойные брони столов: {list(double_booked)}, '
+                f'брони без столов: {orphans.count()}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{booked.count()} tables booked, no table is booked twice'
+        ))
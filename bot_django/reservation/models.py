@@ -1,5 +1,6 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import Q, UniqueConstraint
 
 from bot_django.settings import MAX_CHAR_LENGTH, MAX_DIGIT_LENGTH
 from cafe.models import Cafe
@@ -8,8 +9,15 @@ from tables.models import Table
 
 STATUS_CHOICES = [
     ('booked', 'Забронировано'),
+    ('held', 'Удержано до оплаты'),
     ('cancelled', 'Отменено')
 ]
+# Статусы, при которых столы брони заняты.
+ACTIVE_STATUSES = ('booked', 'held')
+
+OUTBOX_KIND_CHOICES = [
+    ('reservation_created', 'Новая бронь'),
+]
 
 
 class Reservation(models.Model):
@@ -45,11 +53,32 @@ class Reservation(models.Model):
         choices=STATUS_CHOICES,
         default='booked'
     )
+    hold_expires_at = models.DateTimeField(
+        'Удержание действует до',
+        null=True,
+        blank=True
+    )
 
     class Meta:
         verbose_name = 'Бронь'
         verbose_name_plural = 'Брони'
         ordering = ('date',)
+        indexes = [
+            models.Index(
+                fields=('cafe', 'date', 'status'),
+                name='reservation_cafe_date_status'
+            ),
+            models.Index(
+                fields=('date',),
+                condition=Q(status__in=ACTIVE_STATUSES),
+                name='reservation_active_date'
+            ),
+            models.Index(
+                fields=('hold_expires_at',),
+                condition=Q(status='held'),
+                name='reservation_held_expires'
+            ),
+        ]
 
     def __str__(self):
         return f'Бронь в кафе {self.cafe} для {self.name} на {self.date}'
@@ -103,3 +132,140 @@ class TableReservation(models.Model):
     class Meta:
         verbose_name = 'Бронь стола'
         verbose_name_plural = 'Брони столов'
+
+
+class Availability(models.Model):
+    """Свободные места в кафе на дату, пересчитываются при изменении броней."""
+    cafe = models.ForeignKey(
+        Cafe,
+        on_delete=models.CASCADE,
+        related_name='availability',
+        verbose_name='Кафе',
+    )
+    date = models.DateField(
+        verbose_name='Дата'
+    )
+    quantity = models.PositiveIntegerField(
+        'Свободных мест',
+        default=0
+    )
+    simple_quantity = models.PositiveIntegerField(
+        'Свободных мест за обычными столами',
+        default=0
+    )
+    bar_quantity = models.PositiveIntegerField(
+        'Свободных барных мест',
+        default=0
+    )
+    max_table = models.PositiveIntegerField(
+        'Самый большой свободный стол',
+        default=0
+    )
+    free_tables = models.JSONField(
+        'Свободные столы',
+        default=list
+    )
+
+    class Meta:
+        verbose_name = 'Свободные места'
+        verbose_name_plural = 'Свободные места'
+        constraints = [
+            UniqueConstraint(
+                fields=('cafe', 'date'),
+                name='unique_availability_cafe_date'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.quantity} свободных мест в {self.cafe} на {self.date}'
+
+
+class OutboxEvent(models.Model):
+    """Событие для бота, записанное в одной транзакции с бронью."""
+    reservation = models.ForeignKey(
+        Reservation,
+        on_delete=models.CASCADE,
+        related_name='outbox_events',
+        verbose_name='Бронь',
+    )
+    kind = models.CharField(
+        'Тип события',
+        max_length=MAX_CHAR_LENGTH,
+        choices=OUTBOX_KIND_CHOICES
+    )
+    payload = models.JSONField(
+        'Данные события',
+        default=dict
+    )
+    created_at = models.DateTimeField(
+        'Создано',
+        auto_now_add=True
+    )
+    locked_until = models.DateTimeField(
+        'Выдано боту до',
+        null=True,
+        blank=True
+    )
+    processed_at = models.DateTimeField(
+        'Обработано',
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Событие для бота'
+        verbose_name_plural = 'События для бота'
+        ordering = ('id',)
+        indexes = [
+            models.Index(
+                fields=('id',),
+                condition=Q(processed_at__isnull=True),
+                name='outbox_pending'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} №{self.reservation_id}'
+
+
+class IdempotencyKey(models.Model):
+    """Ответ на запрос с заголовком Idempotency-Key для повторов."""
+    key = models.CharField(
+        'Ключ',
+        max_length=MAX_CHAR_LENGTH
+    )
+    path = models.CharField(
+        'Путь запроса',
+        max_length=MAX_CHAR_LENGTH
+    )
+    fingerprint = models.CharField(
+        'Хеш тела запроса',
+        max_length=64
+    )
+    status_code = models.PositiveSmallIntegerField(
+        'Код ответа',
+        null=True
+    )
+    response = models.JSONField(
+        'Ответ',
+        encoder=DjangoJSONEncoder,
+        null=True
+    )
+    created_at = models.DateTimeField(
+        'Создано',
+        auto_now_add=True,
+        db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+        constraints = [
+            UniqueConstraint(
+                fields=('path', 'key'),
+                name='idempotency_path_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.path}: {self.key}'
@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from reservation.models import OutboxEvent
+
+
+def reservation_created(reservation, order_sets, quantity, chat_id=None):
+    """Событие о новой брони.
+
+    Вызывается внутри транзакции создания брони, поэтому событие
+    появляется тогда и только тогда, когда бронь сохранена. В событии
+    всё, что нужно боту для уведомления админов и напоминания клиенту.
+    """
+    cafe = reservation.cafe
+    return OutboxEvent.objects.create(
+        reservation=reservation,
+        kind='reservation_created',
+        payload={
+            'reservation': reservation.id,
+            'chat_id': chat_id,
+            'cafe': {
+                'id': cafe.id,
+                'address': cafe.address,
+                'number': cafe.number,
+                'latitude': cafe.latitude,
+                'longitude': cafe.longitude,
+                'timezone': cafe.timezone,
+            },
+            'date': reservation.date.isoformat(),
+            'name': reservation.name,
+            'number': reservation.number,
+            'quantity': quantity,
+            'sets': [
+                {'sets': order.sets_id, 'quantity': order.quantity}
+                for order in order_sets
+            ],
+            'total_price': str(sum(
+                order.sets.price * order.quantity for order in order_sets
+            )),
+        }
+    )
+
+
+def claim_events(limit, lease):
+    """Выдать боту до limit необработанных событий на lease секунд.
+
+    Строки, которые сейчас выдаёт другой запрос, пропускаются, а выданные
+    события не отдаются повторно до истечения lease, поэтому несколько
+    копий бота не обрабатывают одно событие одновременно. Событие, не
+    подтверждённое за lease секунд, выдаётся снова. События удержаний
+    ждут подтверждения брони.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects
+            .select_for_update(skip_locked=True, of=('self',))
+            .filter(processed_at__isnull=True, reservation__status='booked')
+            .filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+            .order_by('id')[:limit]
+        )
+        OutboxEvent.objects.filter(
+            id__in=[event.id for event in events]
+        ).update(locked_until=now + timedelta(seconds=lease))
+    return events
+
+
+def acknowledge_events(ids):
+    """Отметить события обработанными одним запросом."""
+    return OutboxEvent.objects.filter(
+        id__in=ids, processed_at__isnull=True
+    ).update(processed_at=timezone.now())
@@ -0,0 +1,13 @@
+from django.urls import include, path
+from rest_framework.routers import SimpleRouter
+
+from reservation.views import OutboxViewSet
+
+app_name = 'outbox'
+
+router_v1 = SimpleRouter()
+router_v1.register('', OutboxViewSet)
+
+urlpatterns = [
+    path('', include(router_v1.urls)),
+]
@@ -1,14 +1,21 @@
 from rest_framework import serializers
 from django.db import transaction
 
+from menu.models import Set
 from menu.serializers import SetReadSerializer
-from reservation.models import OrderSets, Reservation
+from reservation.allocation import get_allocator
+from reservation.availability import lock_availability
+from reservation.holds import release_expired
+from reservation.models import (STATUS_CHOICES, OrderSets, OutboxEvent,
+                                Reservation)
+from reservation.outbox import reservation_created
 from tables.models import Table
 from tables.serializers import TableSerializer
 
 
 class OrderSetsSerializer(serializers.ModelSerializer):
-    sets = SetReadSerializer
+    # Сеты всего заказа проверяются одним запросом в validate_sets.
+    sets = serializers.IntegerField()
 
     class Meta:
         fields = 'sets', 'quantity'
@@ -18,93 +25,73 @@ class OrderSetsSerializer(serializers.ModelSerializer):
 class ReservationWriteSerializer(serializers.ModelSerializer):
     quantity = serializers.IntegerField()
     sets = OrderSetsSerializer(many=True)
+    chat_id = serializers.IntegerField(required=False, write_only=True)
 
     class Meta:
-        fields = ('id', 'quantity', 'sets', 'date', 'name', 'number')
+        fields = (
+            'id', 'quantity', 'sets', 'date', 'name', 'number', 'chat_id'
+        )
         model = Reservation
 
+    def validate_sets(self, value):
+        """Заменяем id сетов на сеты одним запросом на весь заказ."""
+        found = Set.objects.in_bulk({res_set['sets'] for res_set in value})
+        for res_set in value:
+            if res_set['sets'] not in found:
+                raise serializers.ValidationError(
+                    f'Недопустимый первичный ключ "{res_set["sets"]}" - '
+                    'объект не существует.'
+                )
+            res_set['sets'] = found[res_set['sets']]
+        return value
+
     def create(self, validated_data):
         res_sets = validated_data.pop('sets')
         res_quantity = validated_data.pop('quantity')
-        reservation = Reservation.objects.create(**validated_data)
-        for res_set in res_sets:
-            OrderSets.objects.create(
-                reservation=reservation,
-                sets=res_set['sets'],
-                quantity=res_set['quantity']
+        chat_id = validated_data.pop('chat_id', None)
+        with transaction.atomic():
+            availability = lock_availability(
+                validated_data['cafe'].id, validated_data['date']
+            )
+            if release_expired(
+                validated_data['cafe'].id, validated_data['date']
+            ):
+                availability.refresh_from_db()
+            tables = self.get_available_table(availability, res_quantity)
+            reservation = Reservation.objects.create(**validated_data)
+            order_sets = OrderSets.objects.bulk_create([
+                OrderSets(
+                    reservation=reservation,
+                    sets=res_set['sets'],
+                    quantity=res_set['quantity']
+                )
+                for res_set in res_sets
+            ])
+            reservation.table.set(tables)
+            reservation_created(
+                reservation, order_sets, res_quantity, chat_id
             )
-        validated_data['quantity'] = res_quantity
-        self.get_available_table(validated_data, reservation)
         return reservation
 
-    def get_available_table(self, validated_data, reservation):
+    def get_available_table(self, availability, quantity):
         """
-        Ищем доступные столы и создаем связь с бронью, либо выдаем ошибку
+        Подбираем столы из свободных на дату, либо выдаем ошибку.
+        Вызывается под блокировкой записи о свободных местах.
         """
-        cafe = validated_data.pop('cafe')
-        quantity = validated_data.pop('quantity')
-        date = validated_data.pop('date')
-        unailable_tables = reservation.table.through.objects.filter(
-            reservation__cafe__id=cafe.id,
-            reservation__date=date,
-            reservation__status='booked'
-        ).values('table')
-        with transaction.atomic():
-            if quantity == 1:
-                available_bar_tables = Table.objects.select_for_update(
-                ).filter(
-                    cafe__id=cafe.id,
-                    table_type='bar_table',
-                ).exclude(
-                    id__in=unailable_tables
-                )
-                available_bar_tables = available_bar_tables.filter(
-                    quantity__gte=1).first()
-                if available_bar_tables:
-                    reservation.table.add(available_bar_tables)
-                    return
-            available_simple_tables = Table.objects.select_for_update().filter(
-                cafe__id=cafe.id,
-                table_type='simple_table',
-            ).exclude(
-                id__in=unailable_tables
+        available_tables = list(
+            Table.objects.filter(id__in=availability.free_tables).values(
+                'id', 'quantity', 'table_type'
             )
-            available_bar_tables = Table.objects.select_for_update().filter(
-                cafe__id=cafe.id,
-                table_type='bar_table',
-            ).exclude(
-                id__in=unailable_tables
+        )
+        tables = get_allocator().allocate(available_tables, quantity)
+        if not tables:
+            raise serializers.ValidationError(
+                {
+                    'status': 'error',
+                    'message': 'Недостаточно свободных столов.'
+                }
             )
-            single_table = available_simple_tables.filter(
-                quantity__gte=quantity).first()
-            if single_table:
-                reservation.table.add(single_table)
-                return
-            else:
-                merged_tables = self.merge_tables(
-                    available_simple_tables, quantity)
-                if merged_tables:
-                    reservation.table.set(merged_tables)
-                else:
-                    reservation.delete()
-                    raise serializers.ValidationError(
-                        {
-                            'status': 'error',
-                            'message': 'Недостаточно свободных столов.'
-                        }
-                    )
-
-    def merge_tables(self, available_tables, required_quantity):
-        """Соединяем столы"""
-        available_tables = available_tables.order_by('-quantity')
-        merged_tables = []
-        total_quantity = 0
-        for table in available_tables:
-            merged_tables.append(table)
-            total_quantity += table.quantity
-            if total_quantity >= required_quantity:
-                return merged_tables
-        return None
+        return tables
 
 
 class ReservationReadSerializer(serializers.ModelSerializer):
@@ -112,5 +99,36 @@ class ReservationReadSerializer(serializers.ModelSerializer):
     sets = SetReadSerializer(many=True, read_only=True)
 
     class Meta:
-        fields = ('id', 'table', 'sets', 'date', 'name', 'number', 'status')
+        fields = (
+            'id', 'table', 'sets', 'date', 'name', 'number', 'status',
+            'hold_expires_at'
+        )
         model = Reservation
+
+
+class ReservationFilterSerializer(serializers.Serializer):
+    date_after = serializers.DateField(required=False)
+    date_before = serializers.DateField(required=False)
+    status = serializers.ChoiceField(choices=STATUS_CHOICES, required=False)
+
+
+class OutboxEventSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        fields = ('id', 'kind', 'payload', 'created_at')
+        model = OutboxEvent
+
+
+class OutboxClaimSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(
+        min_value=1, max_value=1000, default=100
+    )
+    lease = serializers.IntegerField(
+        min_value=1, max_value=3600, default=60
+    )
+
+
+class OutboxAckSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), max_length=1000
+    )
@@ -0,0 +1,52 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from reservation.availability import refresh_availability
+from reservation.models import Availability, Reservation
+from tables.models import Table
+
+
+@receiver(pre_save, sender=Reservation)
+def remember_reservation_slot(sender, instance, **kwargs):
+    """Запоминаем прежние кафе и дату брони до сохранения."""
+    instance._previous_slot = None
+    if instance.pk:
+        instance._previous_slot = Reservation.objects.filter(
+            pk=instance.pk
+        ).values_list('cafe_id', 'date').first()
+
+
+@receiver(post_save, sender=Reservation)
+def reservation_saved(sender, instance, created, **kwargs):
+    """Статус, кафе или дата брони изменились - пересчитываем места."""
+    if created:
+        return
+    slots = {(instance.cafe_id, instance.date)}
+    if instance._previous_slot:
+        slots.add(instance._previous_slot)
+    for cafe_id, res_date in slots:
+        refresh_availability(cafe_id, res_date)
+
+
+@receiver(post_delete, sender=Reservation)
+def reservation_deleted(sender, instance, **kwargs):
+    refresh_availability(instance.cafe_id, instance.date)
+
+
+@receiver(m2m_changed, sender=Reservation.table.through)
+def reservation_tables_changed(sender, instance, action, reverse, **kwargs):
+    """Изменился набор столов брони - пересчитываем места."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        Availability.objects.filter(cafe_id=instance.cafe_id).delete()
+    else:
+        refresh_availability(instance.cafe_id, instance.date)
+
+
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+def table_changed(sender, instance, **kwargs):
+    """Столы кафе изменились - записи о местах рассчитаются заново."""
+    Availability.objects.filter(cafe_id=instance.cafe_id).delete()
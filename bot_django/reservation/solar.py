@@ -0,0 +1,100 @@
+"""Расчёт времени заката по алгоритму NOAA без обращения к сети.
+
+Точность — около минуты для широт без полярного дня и полярной ночи.
+Время возвращается в UTC с tzinfo.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from math import acos, asin, cos, degrees, radians, sin, tan
+
+# Угол центра солнца под горизонтом с учётом рефракции и радиуса диска.
+ZENITH = 90.833
+COS_ZENITH = cos(radians(ZENITH))
+
+
+def _julian_century(moment: datetime):
+    julian_day = moment.timestamp() / 86400 + 2440587.5
+    return (julian_day - 2451545) / 36525
+
+
+def _declination_and_equation(century):
+    """Склонение солнца (радианы) и уравнение времени (минуты)."""
+    mean_longitude = (
+        280.46646 + century * (36000.76983 + century * 0.0003032)
+    ) % 360
+    mean_anomaly = 357.52911 + century * (35999.05029 - 0.0001537 * century)
+    eccentricity = 0.016708634 - century * (
+        0.000042037 + 0.0000001267 * century
+    )
+    anomaly = radians(mean_anomaly)
+    center = (
+        sin(anomaly) * (1.914602 - century * (0.004817 + 0.000014 * century))
+        + sin(2 * anomaly) * (0.019993 - 0.000101 * century)
+        + sin(3 * anomaly) * 0.000289
+    )
+    omega = radians(125.04 - 1934.136 * century)
+    apparent_longitude = radians(
+        mean_longitude + center - 0.00569 - 0.00478 * sin(omega)
+    )
+    mean_obliquity = 23 + (26 + (21.448 - century * (
+        46.815 + century * (0.00059 - century * 0.001813)
+    )) / 60) / 60
+    obliquity = radians(mean_obliquity + 0.00256 * cos(omega))
+    declination = asin(sin(obliquity) * sin(apparent_longitude))
+
+    y = tan(obliquity / 2) ** 2
+    longitude = radians(mean_longitude)
+    equation = 4 * degrees(
+        y * sin(2 * longitude)
+        - 2 * eccentricity * sin(anomaly)
+        + 4 * eccentricity * y * sin(anomaly) * cos(2 * longitude)
+        - 0.5 * y * y * sin(4 * longitude)
+        - 1.25 * eccentricity * eccentricity * sin(2 * anomaly)
+    )
+    return declination, equation
+
+
+def _sunset_minutes(cos_latitude, tan_latitude, longitude, century):
+    """Минуты от полуночи UTC до заката."""
+    declination, equation = _declination_and_equation(century)
+    cos_hour_angle = (
+        COS_ZENITH / (cos_latitude * cos(declination))
+        - tan_latitude * tan(declination)
+    )
+    if not -1 <= cos_hour_angle <= 1:
+        raise ValueError('Солнце в этот день не заходит или не восходит.')
+    return 720 - 4 * longitude - equation + 4 * degrees(acos(cos_hour_angle))
+
+
+def sunsets(latitude: float, longitude: float, days):
+    """Закаты для последовательности дат одной точки."""
+    cos_latitude = cos(radians(latitude))
+    tan_latitude = tan(radians(latitude))
+    result = []
+    for day in days:
+        midnight = datetime.combine(day, time(), tzinfo=timezone.utc)
+        minutes = _sunset_minutes(
+            cos_latitude, tan_latitude, longitude,
+            _julian_century(midnight + timedelta(hours=12))
+        )
+        # Второй проход уточняет положение солнца на момент заката.
+        minutes = _sunset_minutes(
+            cos_latitude, tan_latitude, longitude,
+            _julian_century(midnight + timedelta(minutes=minutes))
+        )
+        result.append(
+            (midnight + timedelta(minutes=minutes)).replace(microsecond=0)
+        )
+    return result
+
+
+def sunset_range(latitude: float, longitude: float, start: date, end: date):
+    """Закаты за период включительно: {дата: время заката}."""
+    days = [
+        start + timedelta(days=offset)
+        for offset in range((end - start).days + 1)
+    ]
+    return dict(zip(days, sunsets(latitude, longitude, days)))
+
+
+def sunset(latitude: float, longitude: float, day: date):
+    return sunsets(latitude, longitude, [day])[0]
@@ -0,0 +1,188 @@
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from cafe.models import Cafe
+from menu.models import Dishes, Set
+from reservation import solar
+from reservation.availability import get_availabilities
+from reservation.models import Availability, Reservation
+from tables.models import Table
+
+# Сколько запросов к БД делает создание брони при любом числе сетов.
+CREATE_QUERIES = 29
+# Закаты в UTC по библиотеке astral 3.2 (алгоритм NOAA): широта,
+# долгота, дата, время. Казань, Москва, Махачкала, Санкт-Петербург,
+# Екатеринбург; равноденствия, солнцестояния и даты Рамадана.
+SUNSET_REFERENCE = [
+    (55.78874, 49.12214, '2024-03-11', '14:39:07'),
+    (55.78874, 49.12214, '2024-04-09', '15:37:56'),
+    (55.78874, 49.12214, '2024-06-21', '17:31:59'),
+    (55.78874, 49.12214, '2024-09-22', '14:41:27'),
+    (55.78874, 49.12214, '2024-12-21', '12:11:12'),
+    (55.78874, 49.12214, '2025-03-01', '14:17:47'),
+    (55.75583, 37.6173, '2024-03-11', '15:25:14'),
+    (55.75583, 37.6173, '2024-04-09', '16:23:57'),
+    (55.75583, 37.6173, '2024-06-21', '18:17:46'),
+    (55.75583, 37.6173, '2024-09-22', '15:27:23'),
+    (55.75583, 37.6173, '2024-12-21', '12:57:27'),
+    (55.75583, 37.6173, '2025-03-01', '15:03:55'),
+    (42.98306, 47.50472, '2024-03-11', '14:51:34'),
+    (42.98306, 47.50472, '2024-04-09', '15:25:33'),
+    (42.98306, 47.50472, '2024-06-21', '16:32:25'),
+    (42.98306, 47.50472, '2024-09-22', '14:46:41'),
+    (42.98306, 47.50472, '2024-12-21', '13:18:07'),
+    (42.98306, 47.50472, '2025-03-01', '14:39:01'),
+    (59.93863, 30.31413, '2024-03-11', '15:51:42'),
+    (59.93863, 30.31413, '2024-04-09', '17:02:29'),
+    (59.93863, 30.31413, '2024-06-21', '19:25:22'),
+    (59.93863, 30.31413, '2024-09-22', '15:57:10'),
+    (59.93863, 30.31413, '2024-12-21', '12:53:10'),
+    (59.93863, 30.31413, '2025-03-01', '15:26:07'),
+    (56.83892, 60.6057, '2024-03-11', '13:52:28'),
+    (56.83892, 60.6057, '2024-04-09', '14:54:03'),
+    (56.83892, 60.6057, '2024-06-21', '16:54:20'),
+    (56.83892, 60.6057, '2024-09-22', '13:55:45'),
+    (56.83892, 60.6057, '2024-12-21', '11:17:53'),
+    (56.83892, 60.6057, '2025-03-01', '13:30:09'),
+]
+# Копия модуля в боте: отдельный контекст сборки Docker.
+BOT_SOLAR = Path(__file__).resolve().parents[2] / 'bot_aiogram/utils/solar.py'
+
+
+class ReservationTestCase(TestCase):
+    """Кафе с тремя столами и пять сетов для броней через API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cafe = Cafe.objects.create(
+            name='Кафе', address='ул. Тестовая', number='1'
+        )
+        Table.objects.bulk_create(
+            Table(
+                name=f'Стол {number}', cafe=cls.cafe, quantity=4,
+                table_type='simple_table'
+            )
+            for number in range(3)
+        )
+        dish = Dishes.objects.create(name='Блюдо', description='Описание')
+        cls.sets = [
+            Set.objects.create(name=f'Сет {number}', description='Описание',
+                               price=400)
+            for number in range(5)
+        ]
+        for menu_set in cls.sets:
+            menu_set.dishes.add(dish)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = f'/cafes/{self.cafe.id}/reservations/'
+        self.days = 0
+
+    def reservation_data(self, set_lines=2):
+        self.days += 1
+        return {
+            'quantity': 2,
+            'sets': [
+                {'sets': menu_set.id, 'quantity': 1}
+                for menu_set in self.sets[:set_lines]
+            ],
+            'date': (date.today() + timedelta(days=self.days)).isoformat(),
+            'name': 'Гость',
+            'number': '89000000000',
+        }
+
+    def create_reservations(self, count):
+        for _ in range(count):
+            response = self.client.post(
+                self.url, self.reservation_data(), format='json'
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+
+
+class ReservationQueriesTest(ReservationTestCase):
+    """Число запросов к БД при выдаче списка броней и создании брони."""
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), len(response.json()['results'])
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        self.create_reservations(1)
+        few_queries, few_rows = self.list_queries()
+        self.create_reservations(9)
+        many_queries, many_rows = self.list_queries()
+        self.assertEqual((few_rows, many_rows), (1, 10))
+        self.assertEqual(many_queries, few_queries)
+
+    def test_create_queries_do_not_grow_with_sets(self):
+        self.create_reservations(1)
+        for set_lines in (1, 5):
+            with self.subTest(set_lines=set_lines):
+                with self.assertNumQueries(CREATE_QUERIES):
+                    response = self.client.post(
+                        self.url, self.reservation_data(set_lines),
+                        format='json'
+                    )
+                self.assertEqual(response.status_code, 200)
+
+    def test_unknown_set_is_rejected(self):
+        data = self.reservation_data()
+        data['sets'].append({'sets': 0, 'quantity': 1})
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sets', response.json())
+
+
+class AvailabilityLedgerTest(ReservationTestCase):
+    """Записи о свободных местах после сброса пересчитываются по броням."""
+
+    def test_rebuilt_rows_exclude_booked_tables(self):
+        self.create_reservations(1)
+        res_date = date.today() + timedelta(days=self.days)
+        booked = set(Reservation.table.through.objects.values_list(
+            'table_id', flat=True
+        ))
+        Table.objects.filter(id__in=booked).first().save()
+        self.assertFalse(Availability.objects.exists())
+        places = get_availabilities(res_date)
+        self.assertEqual(places[0]['quantity'], 8)
+        row = Availability.objects.get(cafe=self.cafe, date=res_date)
+        self.assertFalse(booked & set(row.free_tables))
+        self.assertEqual(len(row.free_tables), 2)
+
+
+class SolarTest(SimpleTestCase):
+    """Точность расчёта закатов по справочной таблице."""
+
+    def test_sunset_matches_reference(self):
+        for latitude, longitude, day, expected in SUNSET_REFERENCE:
+            day = date.fromisoformat(day)
+            expected = datetime.combine(
+                day, datetime.strptime(expected, '%H:%M:%S').time(),
+                tzinfo=timezone.utc
+            )
+            with self.subTest(latitude=latitude, day=day):
+                error = solar.sunset(latitude, longitude, day) - expected
+                self.assertLess(abs(error.total_seconds()), 60)
+
+    def test_sunset_range_matches_sunset(self):
+        start, end = date(2024, 3, 11), date(2024, 4, 9)
+        calendar = solar.sunset_range(55.78874, 49.12214, start, end)
+        self.assertEqual(len(calendar), 30)
+        self.assertEqual(
+            calendar[end], solar.sunset(55.78874, 49.12214, end)
+        )
+
+    @skipUnless(BOT_SOLAR.exists(), 'бот собирается отдельно')
+    def test_bot_copy_is_identical(self):
+        self.assertEqual(
+            BOT_SOLAR.read_bytes(), Path(solar.__file__).read_bytes()
+        )
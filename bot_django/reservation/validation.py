@@ -1,12 +1,12 @@
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 
-import requests
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from rest_framework import serializers
 
-from reservation.models import Reservation
-
-SUNSET_API = 'https://api.sunrisesunset.io/json?lat=55.78874&lng=49.12214'
+from reservation.availability import lock_availability
+from reservation.models import ACTIVE_STATUSES, Reservation
+from reservation.solar import sunset
 
 
 def tables_in_cafe(form_model):
@@ -41,10 +41,11 @@ def tables_available(form_model):
     tables = reservation_data['table']
     date = reservation_data['date']
     cafe = reservation_data['cafe']
+    lock_availability(cafe.id, date)
     unailable_tables = Reservation.table.through.objects.filter(
         reservation__cafe__id=cafe.id,
         reservation__date=date,
-        reservation__status='booked'
+        reservation__status__in=ACTIVE_STATUSES
     ).exclude(reservation=reservation_id).values('table')
     if tables.filter(id__in=unailable_tables):
         raise ValidationError(
@@ -58,37 +59,16 @@ def tables_available(form_model):
 def cancell_reservation(data, rus=False):
     reservation_date = data['date'].value
     reservation_date = date.fromisoformat(reservation_date)
-    today = date.today()
+    today = timezone.localdate()
     if data['status'].value == 'cancelled':
         return
     if reservation_date == today:
-        time_until_cancellation = get_sunset_from_api() - timedelta(hours=2)
-        if time_until_cancellation < datetime.now():
+        cafe = data.instance.cafe
+        time_until_cancellation = sunset(
+            cafe.latitude, cafe.longitude, today
+        ) - timedelta(hours=2)
+        if time_until_cancellation < timezone.now():
             raise serializers.ValidationError(
                 {'status': 'error',
                  'message': 'Отменить менее чем за два часа до брони нельзя!'}
             )
-
-
-def get_sunset_from_api():
-    """Получаем время захода солнца"""
-    try:
-        response = requests.get(SUNSET_API)
-    except requests.ConnectionError:
-        raise serializers.ValidationError(
-            {'status': 'error',
-             'message': 'Ошибка при получении времени заката!'}
-        )
-    data = response.json()
-    if data['status'] != 'OK':
-        raise serializers.ValidationError(
-            {'status': 'error',
-             'message': 'Нет возможности проверить время заката!'}
-        )
-    sunset_today = data['results']['sunset']
-    today = datetime.today()
-    sunset_today = datetime.strptime(sunset_today, '%I:%M:%S %p')
-    sunset_today = sunset_today.replace(
-        year=today.year, month=today.month, day=today.day
-    )
-    return sunset_today
@@ -1,23 +1,59 @@
+from django.db.models import Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from cafe.models import Cafe
-from reservation.models import Reservation
-from reservation.serializers import (ReservationReadSerializer,
+from menu.models import Set
+from reservation.holds import confirm_hold, hold_expires_at, release_hold
+from reservation.idempotency import idempotent
+from reservation.models import OutboxEvent, Reservation
+from reservation.outbox import acknowledge_events, claim_events
+from reservation.pagination import ReservationCursorPagination
+from reservation.serializers import (OutboxAckSerializer,
+                                     OutboxClaimSerializer,
+                                     OutboxEventSerializer,
+                                     ReservationFilterSerializer,
+                                     ReservationReadSerializer,
                                      ReservationWriteSerializer)
 from reservation.validation import cancell_reservation
 
+RESERVATION_PREFETCH = (
+    'table',
+    Prefetch('sets', queryset=Set.objects.prefetch_related('dishes')),
+)
+
 
 class ReservationViewSet(viewsets.ModelViewSet):
     queryset = Reservation.objects.all()
+    pagination_class = ReservationCursorPagination
+    lookup_value_regex = r'\d+'
 
     def get_cafe(self):
         cafe_id = self.kwargs.get('cafe_id')
         return get_object_or_404(Cafe, id=cafe_id)
 
     def get_queryset(self):
-        return Reservation.objects.filter(cafe=self.get_cafe())
+        queryset = Reservation.objects.filter(
+            cafe=self.get_cafe()
+        ).prefetch_related(*RESERVATION_PREFETCH)
+        if self.action == 'list':
+            queryset = self.filter_by_params(queryset)
+        return queryset
+
+    def filter_by_params(self, queryset):
+        """Фильтрация списка броней по диапазону дат и статусу."""
+        params = ReservationFilterSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+        if 'date_after' in params:
+            queryset = queryset.filter(date__gte=params['date_after'])
+        if 'date_before' in params:
+            queryset = queryset.filter(date__lte=params['date_before'])
+        if 'status' in params:
+            queryset = queryset.filter(status=params['status'])
+        return queryset
 
     def get_serializer_class(self):
         method = self.request.method
@@ -25,16 +61,67 @@ class ReservationViewSet(viewsets.ModelViewSet):
             return ReservationReadSerializer
         return ReservationWriteSerializer
 
-    def perform_create(self, serializer):
+    def perform_create(self, serializer, **extra):
         cafe = self.get_cafe()
-        return serializer.save(cafe=cafe)
+        return serializer.save(cafe=cafe, **extra)
 
     def create(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
+        return idempotent(request, lambda: self.create_reservation(request))
+
+    def create_reservation(self, request, **extra):
+        serializer = ReservationWriteSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        instance = self.perform_create(serializer)
-        instance_serializer = ReservationReadSerializer(instance)
-        return Response(instance_serializer.data)
+        instance = self.perform_create(serializer, **extra)
+        prefetch_related_objects([instance], *RESERVATION_PREFETCH)
+        return Response(ReservationReadSerializer(instance).data)
+
+    @action(methods=['POST'], detail=False)
+    def hold(self, request, cafe_id):
+        """Удержать столы до оплаты; бронь создаётся со статусом held."""
+        return idempotent(request, lambda: self.create_reservation(
+            request, status='held', hold_expires_at=hold_expires_at()
+        ))
+
+    @action(methods=['POST'], detail=True)
+    def confirm(self, request, cafe_id, pk):
+        return idempotent(request, lambda: self.confirm_hold(cafe_id, pk))
+
+    def confirm_hold(self, cafe_id, pk):
+        if not confirm_hold(cafe_id, pk):
+            return Response(
+                {
+                    'status': 'error',
+                    'message': 'Время на оплату истекло, столы освобождены.'
+                },
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({'id': int(pk), 'status': 'booked'})
+
+    @action(methods=['POST'], detail=True)
+    def release(self, request, cafe_id, pk):
+        return Response({'released': release_hold(cafe_id, pk)})
 
     def perform_update(self, serializer):
         cancell_reservation(serializer)
+
+
+class OutboxViewSet(viewsets.GenericViewSet):
+    """События для бота: выдача пачкой и подтверждение пачкой."""
+    queryset = OutboxEvent.objects.all()
+    serializer_class = OutboxEventSerializer
+
+    @action(methods=['POST'], detail=False)
+    def claim(self, request):
+        serializer = OutboxClaimSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        events = claim_events(**serializer.validated_data)
+        return Response({
+            'events': OutboxEventSerializer(events, many=True).data
+        })
+
+    @action(methods=['POST'], detail=False)
+    def ack(self, request):
+        serializer = OutboxAckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        processed = acknowledge_events(serializer.validated_data['ids'])
+        return Response({'processed': processed})
@@ -32,6 +32,12 @@ class Table(models.Model):
         verbose_name = 'Стол'
         verbose_name_plural = 'Столы'
         ordering = ('cafe', 'quantity')
+        indexes = [
+            models.Index(
+                fields=('cafe', 'table_type', 'quantity'),
+                name='table_cafe_type_quantity'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name} в {self.cafe.name} на {self.quantity} человек'